@@ -1,9 +1,10 @@
-from .model_downloader import NODE_CLASS_MAPPINGS as MODEL_NODES, NODE_DISPLAY_NAME_MAPPINGS as MODEL_NAMES, WEB_DIRECTORY, download_handler
-from .shutdown_monitor import shutdown_status_handler, shutdown_toggle_handler, activity_ping_handler, shutdown_monitor
+from .model_downloader import NODE_CLASS_MAPPINGS as MODEL_NODES, NODE_DISPLAY_NAME_MAPPINGS as MODEL_NAMES, WEB_DIRECTORY
+from ._routes import _register_routes
 from .character_swap_node import NODE_CLASS_MAPPINGS as CHAR_NODES, NODE_DISPLAY_NAME_MAPPINGS as CHAR_NAMES
 from .eye_stabilizer_node import NODE_CLASS_MAPPINGS as EYE_NODES, NODE_DISPLAY_NAME_MAPPINGS as EYE_NAMES
 from .eye_stabilizer_v2_node import NODE_CLASS_MAPPINGS as EYE_V2_NODES, NODE_DISPLAY_NAME_MAPPINGS as EYE_V2_NAMES
 import server
+import threading
 
 NODE_CLASS_MAPPINGS = {}
 NODE_CLASS_MAPPINGS.update(MODEL_NODES)
@@ -19,20 +20,25 @@ NODE_DISPLAY_NAME_MAPPINGS.update(EYE_V2_NAMES)
 
 try:
     if hasattr(server.PromptServer, 'instance') and server.PromptServer.instance is not None:
-        routes = server.PromptServer.instance.routes
-        routes.post("/model_installer/download")(download_handler)
-        routes.get("/pma_utils/shutdown_status")(shutdown_status_handler)
-        routes.post("/pma_utils/shutdown_toggle")(shutdown_toggle_handler)
-        routes.post("/pma_utils/activity_ping")(activity_ping_handler)
-        
-        shutdown_monitor.set_prompt_server(server.PromptServer.instance)
-        
-        print("[PMA Utils] All routes registered successfully")
-        print("[PMA Utils] Shutdown monitor initialized with queue tracking")
-        print("[PMA Utils] Character swap nodes loaded")
-        print("[PMA Utils] Eye stabilizer node loaded")
-        print("[PMA Utils] Eye stabilizer V2 (ethnicity-aware) loaded")
+        if _register_routes(server.PromptServer.instance):
+            print("[PMA Utils] All routes registered successfully")
+            print("[PMA Utils] Shutdown monitor initialized with queue tracking")
+            print("[PMA Utils] Character swap nodes loaded")
+            print("[PMA Utils] Eye stabilizer node loaded")
+            print("[PMA Utils] Eye stabilizer V2 (ethnicity-aware) loaded")
 except Exception as e:
     print(f"[PMA Utils] Warning: Could not register routes immediately: {e}")
 
+
+def _preload_preprocessors():
+    # Warm the controlnet_aux import while the server starts so the first
+    # character swap doesn't pay for it. The nodes still import it lazily.
+    try:
+        import controlnet_aux  # noqa: F401
+    except Exception:
+        pass
+
+
+threading.Thread(target=_preload_preprocessors, daemon=True).start()
+
 __all__ = ['NODE_CLASS_MAPPINGS', 'NODE_DISPLAY_NAME_MAPPINGS', 'WEB_DIRECTORY']
@@ -0,0 +1,47 @@
+import threading
+
+from .model_downloader import download_handler, close_session
+from .shutdown_monitor import shutdown_status_handler, shutdown_toggle_handler, activity_ping_handler, shutdown_monitor
+
+
+ROUTES = (
+    ("POST", "/model_installer/download", download_handler),
+    ("GET", "/pma_utils/shutdown_status", shutdown_status_handler),
+    ("POST", "/pma_utils/shutdown_toggle", shutdown_toggle_handler),
+    ("POST", "/pma_utils/activity_ping", activity_ping_handler),
+)
+
+ROUTE_PATHS = frozenset(path for _, path, _ in ROUTES)
+
+_REGISTERED = False
+_lock = threading.Lock()
+
+
+def _register_routes(prompt_server):
+    """
+    Register the PMA Utils HTTP routes on the ComfyUI server.
+
+    Safe to call more than once: the first call wins, and paths already
+    present in the server's route table are never added a second time.
+    Returns True if the routes were registered by this call.
+    """
+    global _REGISTERED
+
+    with _lock:
+        if _REGISTERED:
+            return False
+
+        routes = prompt_server.routes
+        existing = frozenset(getattr(route, "path", None) for route in routes) & ROUTE_PATHS
+
+        for method, path, handler in ROUTES:
+            if path not in existing:
+                routes.route(method, path)(handler)
+
+        app = getattr(prompt_server, "app", None)
+        if app is not None and not app.frozen:
+            app.on_cleanup.append(close_session)
+
+        shutdown_monitor.set_prompt_server(prompt_server)
+        _REGISTERED = True
+        return True
@@ -13,12 +13,88 @@ This node provides:
 Usage: Insert between RMBG (background removal) and control map generation in Wan2.2 workflows.
 """
 
+import atexit
+import functools
+import math
+import os
+import threading
 import torch
 import numpy as np
-from PIL import Image, ImageFilter, ImageEnhance
+from PIL import Image, ImageEnhance
 import cv2
 from typing import Tuple, Optional, List, Dict
 from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    from numba import njit
+except ImportError:
+    njit = None
+
+
+def _ear(pts):
+    """Eye Aspect Ratio of a (6, 2) landmark array, computed on scalars."""
+    dx1 = pts[1, 0] - pts[5, 0]
+    dy1 = pts[1, 1] - pts[5, 1]
+    dx2 = pts[2, 0] - pts[4, 0]
+    dy2 = pts[2, 1] - pts[4, 1]
+    dxh = pts[0, 0] - pts[3, 0]
+    dyh = pts[0, 1] - pts[3, 1]
+    v1 = math.sqrt(dx1 * dx1 + dy1 * dy1)
+    v2 = math.sqrt(dx2 * dx2 + dy2 * dy2)
+    h = math.sqrt(dxh * dxh + dyh * dyh)
+    return (v1 + v2) / (2.0 * h + 1e-6)
+
+
+def _kalman_update(est, err, meas, pv, mv):
+    """In-place predict/update of a bank of independent 1D Kalman filters."""
+    err += pv
+    k = err / (err + mv)
+    est += k * (meas - est)
+    err *= 1 - k
+
+
+if njit is not None:
+    # Neither kernel is cached on disk: Numba's cache records the module name
+    # it was compiled under, and ComfyUI imports this file as part of a
+    # package while the tests import it top-level, so a cache written by one
+    # fails to load in the other.
+    _ear = njit(fastmath=True)(_ear)
+    # Numba fuses the elementwise ops into one loop
+    _kalman_update = njit(_kalman_update)
+
+
+# MediaPipe Face Mesh landmark indices (iris points need refine_landmarks)
+LEFT_EYE_IDX = np.array([33, 160, 158, 133, 153, 144], np.int64)  # Left eye outline
+RIGHT_EYE_IDX = np.array([362, 385, 387, 263, 373, 380], np.int64)  # Right eye outline
+LEFT_IRIS_IDX = np.array([468, 469, 470, 471, 472], np.int64)  # Left iris
+RIGHT_IRIS_IDX = np.array([473, 474, 475, 476, 477], np.int64)  # Right iris
+
+# All eye landmarks in one gather, split back per region with EYE_REGION_SPLITS
+EYE_LANDMARK_IDX = np.concatenate([LEFT_EYE_IDX, RIGHT_EYE_IDX, LEFT_IRIS_IDX, RIGHT_IRIS_IDX])
+EYE_REGION_SPLITS = np.cumsum([len(LEFT_EYE_IDX), len(RIGHT_EYE_IDX), len(LEFT_IRIS_IDX)])
+
+
+# PIL's ImageFilter.SHARPEN kernel and the SMOOTH kernel ImageEnhance.Sharpness
+# blends against, used to fold the eye sharpening into one cv2.filter2D pass
+SHARPEN_KERNEL = np.array([[-2, -2, -2], [-2, 32, -2], [-2, -2, -2]], dtype=np.float32) / 16
+SMOOTH_KERNEL = np.array([[1, 1, 1], [1, 5, 1], [1, 1, 1]], dtype=np.float32) / 13
+
+
+@functools.lru_cache(maxsize=32)
+def _eye_sharpen_kernel(strength):
+    """
+    5x5 kernel equivalent to SHARPEN followed by Sharpness(strength).
+
+    Sharpness(f) is f * img - (f - 1) * smooth(img), so applied to the
+    sharpened image the whole chain is one linear filter.
+    """
+    smoothed = np.zeros((5, 5), dtype=np.float32)
+    for (i, j), weight in np.ndenumerate(SMOOTH_KERNEL):
+        smoothed[i:i + 3, j:j + 3] += weight * SHARPEN_KERNEL
+    kernel = -(strength - 1) * smoothed
+    kernel[1:4, 1:4] += strength * SHARPEN_KERNEL
+    return kernel
 
 
 class KalmanFilter1D:
@@ -41,6 +117,79 @@ class KalmanFilter1D:
         self.error_estimate = (1 - kalman_gain) * prediction_error
         
         return self.estimate
+    
+    def update_batch(self, measurements):
+        """
+        Filter a whole sequence of measurements, time along axis 0.
+        
+        A (T,) array is run through this filter exactly as T update() calls
+        would be. A (T, N) array runs N independent channels in lockstep,
+        one vectorized step per time index. The gain sequence does not
+        depend on the data, so all channels share one error estimate.
+        
+        Returns:
+            np.ndarray: Filtered values, same shape as measurements
+        """
+        measurements = np.asarray(measurements, dtype=np.float64)
+        filtered = np.empty_like(measurements)
+        estimate = np.array(self.estimate, dtype=np.float64)
+        error_estimate = self.error_estimate
+        
+        for t, measurement in enumerate(measurements):
+            prediction_error = error_estimate + self.process_variance
+            kalman_gain = prediction_error / (prediction_error + self.measurement_variance)
+            estimate = estimate + kalman_gain * (measurement - estimate)
+            error_estimate = (1 - kalman_gain) * prediction_error
+            filtered[t] = estimate
+        
+        self.estimate = float(estimate) if estimate.ndim == 0 else estimate
+        self.error_estimate = error_estimate
+        return filtered
+
+
+class VectorKalman1D:
+    """
+    Bank of independent KalmanFilter1D filters stored as one state vector.
+    
+    Each element of the measurement array gets its own filter; all of them are
+    updated together with elementwise array ops.
+    """
+    
+    def __init__(self, shape, process_variance=1e-3, measurement_variance=1e-1):
+        self.pv = np.float32(process_variance)
+        self.mv = np.float32(measurement_variance)
+        self.est = np.zeros(shape, dtype=np.float32)
+        self.err = np.ones(shape, dtype=np.float32)
+        
+    def update(self, meas):
+        """Update all filters with a measurement array of the same shape."""
+        _kalman_update(self.est, self.err, np.asarray(meas, dtype=np.float32), self.pv, self.mv)
+        return self.est.copy()
+
+
+class KalmanFilterTorch:
+    """
+    VectorKalman1D with its state held in torch tensors on a given device.
+    
+    For measurements that are already tensors (e.g. on the GPU with the
+    frames): each update is a handful of pointwise kernels and never
+    round-trips through the CPU.
+    """
+    
+    def __init__(self, shape, device="cpu", process_variance=1e-3, measurement_variance=1e-1):
+        self.pv = process_variance
+        self.mv = measurement_variance
+        self.est = torch.zeros(shape, dtype=torch.float32, device=device)
+        self.err = torch.ones(shape, dtype=torch.float32, device=device)
+        
+    def update(self, meas):
+        """Update all filters with a measurement tensor of the same shape."""
+        meas = torch.as_tensor(meas, dtype=torch.float32, device=self.est.device)
+        self.err.add_(self.pv)
+        k = self.err / (self.err + self.mv)
+        self.est.addcmul_(k, meas - self.est)
+        self.err.mul_(1 - k)
+        return self.est.clone()
 
 
 class BlinkDetector:
@@ -50,6 +199,7 @@ class BlinkDetector:
         self.history_size = history_size
         self.threshold = threshold
         self.ear_history = deque(maxlen=history_size)  # Eye Aspect Ratio history
+        self._ear_sum = 0.0  # Running sum of ear_history
         
     def calculate_ear(self, eye_landmarks):
         """
@@ -64,17 +214,29 @@ class BlinkDetector:
         if len(eye_landmarks) < 6:
             return 0.3  # Default open eye
         
-        # Vertical distances
-        v1 = np.linalg.norm(eye_landmarks[1] - eye_landmarks[5])
-        v2 = np.linalg.norm(eye_landmarks[2] - eye_landmarks[4])
-        
-        # Horizontal distance
-        h = np.linalg.norm(eye_landmarks[0] - eye_landmarks[3])
-        
-        # EAR calculation
-        ear = (v1 + v2) / (2.0 * h + 1e-6)
+        # Vertical distances (1-5, 2-4) over horizontal distance (0-3)
+        return float(_ear(np.asarray(eye_landmarks, dtype=np.float64)))
+    
+    def is_blink_batch(self, pts, threshold):
+        """
+        Flag closed eyes for a batch of landmark sets without a branch.
         
-        return ear
+        Args:
+            pts: Array of eye landmarks [B, 6, 2]
+            threshold: EAR below which an eye counts as closed
+            
+        Returns:
+            np.ndarray: Boolean array [B], True where EAR < threshold
+        """
+        pts = np.asarray(pts, dtype=np.float32)
+        v1_sq = np.square(pts[:, 1] - pts[:, 5]).sum(-1)
+        v2_sq = np.square(pts[:, 2] - pts[:, 4]).sum(-1)
+        h_sq = np.square(pts[:, 0] - pts[:, 3]).sum(-1)
+        
+        # (v1 + v2) / (2h) < T  <=>  (v1 + v2)^2 < (2T)^2 * h^2, both sides
+        # being non-negative: no divide and no sqrt for the horizontal span
+        vertical = np.sqrt(v1_sq) + np.sqrt(v2_sq)
+        return vertical * vertical < (4.0 * threshold * threshold) * h_sq
     
     def detect_blink(self, left_ear, right_ear):
         """
@@ -88,13 +250,16 @@ class BlinkDetector:
             bool: True if blink detected
         """
         avg_ear = (left_ear + right_ear) / 2.0
+        if len(self.ear_history) == self.history_size:
+            self._ear_sum -= self.ear_history[0]  # About to be evicted
         self.ear_history.append(avg_ear)
+        self._ear_sum += avg_ear
         
         if len(self.ear_history) < self.history_size:
             return False
         
         # Blink if current EAR is significantly lower than average
-        avg_historical = sum(self.ear_history) / len(self.ear_history)
+        avg_historical = self._ear_sum / len(self.ear_history)
         
         return avg_ear < (avg_historical * (1 - self.threshold))
     
@@ -114,7 +279,7 @@ class BlinkDetector:
         
         if is_blinking:
             # During blink, interpolate smoothly
-            avg_historical = sum(self.ear_history) / len(self.ear_history)
+            avg_historical = self._ear_sum / len(self.ear_history)
             return current_ear * 0.3 + avg_historical * 0.7
         
         return current_ear
@@ -126,10 +291,20 @@ class EyeStabilizerNode:
     Fixes glitching, jittering, and unnatural blinking.
     """
     
+    # One MediaPipe FaceMesh graph per process, shared across node instances
+    # and runs; only the trackers are reset per sequence
+    _shared_face_mesh = None
+    _face_mesh_lock = threading.Lock()
+    
+    # ComfyUI calls INPUT_TYPES on every graph validation; the spec never
+    # changes, so it is built once per class
+    _INPUT_TYPES_CACHE = None
+    
     def __init__(self):
         self.type = "EyeStabilizerNode"
-        self.landmark_filters = {}  # Kalman filters for each landmark
+        self.filter_state = {}  # VectorKalman1D per landmark set
         self.blink_detector = BlinkDetector()
+        self._dilate_kernel = None  # Eye mask structuring element for the current sequence
         self.mediapipe_available = False
         
         # Try to import MediaPipe
@@ -145,68 +320,85 @@ class EyeStabilizerNode:
     
     @classmethod
     def INPUT_TYPES(cls):
-        return {
-            "required": {
-                "images": ("IMAGE",),  # Video frames as image batch
-                "enable_temporal_smoothing": ("BOOLEAN", {
-                    "default": True,
-                    "label_on": "Enabled",
-                    "label_off": "Disabled"
-                }),
-                "enable_blink_detection": ("BOOLEAN", {
-                    "default": True,
-                    "label_on": "Enabled",
-                    "label_off": "Disabled"
-                }),
-                "enable_eye_enhancement": ("BOOLEAN", {
-                    "default": True,
-                    "label_on": "Enabled",
-                    "label_off": "Disabled"
-                }),
-                "smoothing_strength": ("FLOAT", {
-                    "default": 0.7,
-                    "min": 0.0,
-                    "max": 1.0,
-                    "step": 0.05,
-                    "display": "slider",
-                    "tooltip": "Higher = more smoothing (less responsive)"
-                }),
-                "enhancement_strength": ("FLOAT", {
-                    "default": 1.3,
-                    "min": 1.0,
-                    "max": 2.0,
-                    "step": 0.1,
-                    "display": "slider",
-                    "tooltip": "Eye sharpening strength"
-                }),
-                "blink_threshold": ("FLOAT", {
-                    "default": 0.2,
-                    "min": 0.1,
-                    "max": 0.5,
-                    "step": 0.05,
-                    "display": "slider",
-                    "tooltip": "Sensitivity for blink detection"
-                }),
-            },
-            "optional": {
-                "eye_region_dilation": ("INT", {
-                    "default": 10,
-                    "min": 0,
-                    "max": 50,
-                    "step": 5,
-                    "tooltip": "Pixels to expand eye mask region"
-                }),
+        if cls._INPUT_TYPES_CACHE is None:
+            cls._INPUT_TYPES_CACHE = {
+                "required": {
+                    "images": ("IMAGE",),  # Video frames as image batch
+                    "enable_temporal_smoothing": ("BOOLEAN", {
+                        "default": True,
+                        "label_on": "Enabled",
+                        "label_off": "Disabled"
+                    }),
+                    "enable_blink_detection": ("BOOLEAN", {
+                        "default": True,
+                        "label_on": "Enabled",
+                        "label_off": "Disabled"
+                    }),
+                    "enable_eye_enhancement": ("BOOLEAN", {
+                        "default": True,
+                        "label_on": "Enabled",
+                        "label_off": "Disabled"
+                    }),
+                    "smoothing_strength": ("FLOAT", {
+                        "default": 0.7,
+                        "min": 0.0,
+                        "max": 1.0,
+                        "step": 0.05,
+                        "display": "slider",
+                        "tooltip": "Higher = more smoothing (less responsive)"
+                    }),
+                    "enhancement_strength": ("FLOAT", {
+                        "default": 1.3,
+                        "min": 1.0,
+                        "max": 2.0,
+                        "step": 0.1,
+                        "display": "slider",
+                        "tooltip": "Eye sharpening strength"
+                    }),
+                    "blink_threshold": ("FLOAT", {
+                        "default": 0.2,
+                        "min": 0.1,
+                        "max": 0.5,
+                        "step": 0.05,
+                        "display": "slider",
+                        "tooltip": "Sensitivity for blink detection"
+                    }),
+                },
+                "optional": {
+                    "eye_region_dilation": ("INT", {
+                        "default": 10,
+                        "min": 0,
+                        "max": 50,
+                        "step": 5,
+                        "tooltip": "Pixels to expand eye mask region"
+                    }),
+                    "mp_input_size": ("INT", {
+                        "default": 0,
+                        "min": 0,
+                        "max": 4096,
+                        "step": 32,
+                        "tooltip": "Longest side frames are downscaled to for face detection (0 = full size)"
+                    }),
+                    "enable_debug": ("BOOLEAN", {
+                        "default": False,
+                        "label_on": "Enabled",
+                        "label_off": "Disabled",
+                        "tooltip": "Draw landmarks on debug_visualization (passes frames through when off)"
+                    }),
+                }
             }
-        }
+        return cls._INPUT_TYPES_CACHE
     
     RETURN_TYPES = ("IMAGE", "MASK", "IMAGE")
     RETURN_NAMES = ("stabilized_images", "eye_mask", "debug_visualization")
     FUNCTION = "stabilize_eyes"
     CATEGORY = "PMA Utils/Video Processing"
     
+    @torch.inference_mode()
     def stabilize_eyes(self, images, enable_temporal_smoothing, enable_blink_detection,
                       enable_eye_enhancement, smoothing_strength, enhancement_strength,
-                      blink_threshold, eye_region_dilation=10):
+                      blink_threshold, eye_region_dilation=10, mp_input_size=0,
+                      enable_debug=False):
         """
         Main function to stabilize eyes across video frames.
         
@@ -219,6 +411,8 @@ class EyeStabilizerNode:
             enhancement_strength: Sharpening strength (1-2)
             blink_threshold: Blink detection sensitivity (0.1-0.5)
             eye_region_dilation: Pixels to expand eye mask
+            mp_input_size: Longest side for face detection input (0 = full size)
+            enable_debug: Draw landmark overlay on the debug output
             
         Returns:
             Tuple of (stabilized_images, eye_mask, debug_visualization)
@@ -230,256 +424,274 @@ class EyeStabilizerNode:
         print(f"[EyeStabilizer] Eye Enhancement: {enable_eye_enhancement}")
         
         # Reset state for new sequence
-        self.landmark_filters = {}
+        self.filter_state = {}
         self.blink_detector = BlinkDetector(threshold=blink_threshold)
         
-        # Process each frame
+        # FaceMesh in tracking mode derives each frame's face ROI from the
+        # previous frame's landmarks and only re-runs the face detector when
+        # tracking is lost. Resetting the shared graph keeps the last clip's
+        # ROI from leaking into this one's first frame.
+        if self.mediapipe_available:
+            self.face_mesh = self._get_face_mesh()
+            self.face_mesh.reset()
+        
+        # Dilation is fixed for the sequence, so build its kernel once
+        self._dilate_kernel = (
+            cv2.getStructuringElement(cv2.MORPH_RECT, (eye_region_dilation, eye_region_dilation))
+            if eye_region_dilation > 0 else None
+        )
+        
+        # Convert the whole batch to uint8 once, up front
+        frames_np = self._tensor_to_uint8(images)
         batch_size = images.shape[0]
-        stabilized_frames = []
-        eye_masks = []
-        debug_frames = []
         
-        for i in range(batch_size):
-            frame = images[i]
-            
-            # Process single frame
-            stabilized, eye_mask, debug_viz = self._process_frame(
-                frame, 
-                enable_temporal_smoothing,
-                enable_blink_detection,
+        # Pass 1 (serial): MediaPipe runs in tracking mode and the Kalman and
+        # blink state carry from frame to frame, so frames go in order
+        tracked = [None] * batch_size
+        if self.mediapipe_available:
+            for i in range(batch_size):
+                tracked[i] = self._track_eyes(
+                    frames_np[i],
+                    enable_temporal_smoothing,
+                    enable_blink_detection,
+                    smoothing_strength,
+                    mp_input_size
+                )
+                
+                if (i + 1) % 10 == 0:
+                    print(f"[EyeStabilizer] Tracked {i + 1}/{batch_size} frames")
+        
+        # Output batches are allocated once and filled frame by frame
+        height, width = frames_np.shape[1:3]
+        stabilized_batch = torch.empty(frames_np.shape, dtype=torch.float32)
+        eye_mask_batch = torch.empty((batch_size, height, width, 1), dtype=torch.float32)
+        debug_batch = torch.empty(frames_np.shape, dtype=torch.float32)
+        
+        # Pass 2 (parallel): masks, enhancement and tensor conversion only
+        # depend on the frame and its landmarks; OpenCV releases the GIL.
+        # Inference mode is thread-local, so workers enter it themselves.
+        @torch.inference_mode()
+        def render(i):
+            stabilized_tensor, eye_mask_tensor, debug_tensor = self._process_frame(
+                frames_np[i],
+                tracked[i],
                 enable_eye_enhancement,
-                smoothing_strength,
                 enhancement_strength,
-                eye_region_dilation
+                eye_region_dilation,
+                enable_debug
             )
-            
-            stabilized_frames.append(stabilized)
-            eye_masks.append(eye_mask)
-            debug_frames.append(debug_viz)
-            
-            if (i + 1) % 10 == 0:
-                print(f"[EyeStabilizer] Processed {i + 1}/{batch_size} frames")
+            stabilized_batch[i].copy_(stabilized_tensor)
+            eye_mask_batch[i].copy_(eye_mask_tensor)
+            debug_batch[i].copy_(debug_tensor)
         
-        # Stack frames back into batches
-        stabilized_batch = torch.stack(stabilized_frames, dim=0)
-        eye_mask_batch = torch.stack(eye_masks, dim=0)
-        debug_batch = torch.stack(debug_frames, dim=0)
+        with ThreadPoolExecutor(max_workers=min(batch_size, os.cpu_count() or 1)) as pool:
+            for _ in pool.map(render, range(batch_size)):
+                pass
         
         print(f"[EyeStabilizer] Completed processing {batch_size} frames")
         
+        # CPU tensors, as ComfyUI expects for IMAGE/MASK outputs
         return (stabilized_batch, eye_mask_batch, debug_batch)
     
-    def _process_frame(self, frame, enable_smoothing, enable_blink,
-                      enable_enhancement, smoothing_strength,
-                      enhancement_strength, dilation):
-        """Process a single frame."""
+    def _process_frame(self, frame_np, eyes, enable_enhancement,
+                      enhancement_strength, dilation, enable_debug=False):
+        """
+        Render the outputs for a single uint8 RGB frame.
         
-        # Convert to numpy and PIL
-        frame_np = (frame.cpu().numpy() * 255).astype(np.uint8)
-        frame_pil = Image.fromarray(frame_np)
+        Args:
+            frame_np: Frame as uint8 ndarray [H, W, 3]
+            eyes: Result of _track_eyes for this frame, or None if no face
+            
+        Safe to call concurrently for different frames.
+        """
         
-        # Initialize output
-        stabilized_pil = frame_pil.copy()
-        eye_mask_pil = Image.new('L', frame_pil.size, 0)  # Black mask
-        debug_pil = frame_pil.copy()
+        # Frames stay uint8 ndarrays for MediaPipe and OpenCV; outputs are only
+        # replaced (never written in place) so no defensive copies are needed
+        height, width = frame_np.shape[:2]
+        stabilized_np = frame_np
+        eye_mask_np = np.zeros((height, width), dtype=np.uint8)  # Black mask
+        debug_np = frame_np
         
-        if self.mediapipe_available:
-            # Process with MediaPipe Face Mesh
-            stabilized_pil, eye_mask_pil, debug_pil = self._process_with_mediapipe(
-                frame_pil, enable_smoothing, enable_blink, enable_enhancement,
-                smoothing_strength, enhancement_strength, dilation
+        if eyes is not None:
+            stabilized_np, eye_mask_np, debug_np = self._render_eyes(
+                frame_np, eyes, enable_enhancement, enhancement_strength, dilation, enable_debug
             )
-        else:
+        elif not self.mediapipe_available:
             # Fallback: Basic processing without face detection
             if enable_enhancement:
-                stabilized_pil = self._enhance_image(frame_pil, enhancement_strength)
+                stabilized_np = self._enhance_image(frame_np, enhancement_strength)
         
         # Convert back to tensors
-        stabilized_tensor = self._pil_to_tensor(stabilized_pil)
-        eye_mask_tensor = self._pil_to_tensor(eye_mask_pil.convert('RGB'))[:, :, 0:1]  # Single channel
-        debug_tensor = self._pil_to_tensor(debug_pil)
+        stabilized_tensor = self._np_to_tensor(stabilized_np)
+        eye_mask_tensor = torch.from_numpy(
+            eye_mask_np.astype(np.float32) * np.float32(1 / 255.0)
+        ).unsqueeze(-1)  # Single channel
+        debug_tensor = self._np_to_tensor(debug_np)
         
         return stabilized_tensor, eye_mask_tensor, debug_tensor
     
-    def _process_with_mediapipe(self, frame_pil, enable_smoothing, enable_blink,
-                               enable_enhancement, smoothing_strength,
-                               enhancement_strength, dilation):
-        """Process frame using MediaPipe Face Mesh."""
-        
-        # Initialize face mesh if needed
-        if self.face_mesh is None:
-            self.face_mesh = self.mp_face_mesh.FaceMesh(
-                static_image_mode=False,
-                max_num_faces=1,
-                refine_landmarks=True,  # Get iris landmarks
-                min_detection_confidence=0.5,
-                min_tracking_confidence=0.5
-            )
+    def _track_eyes(self, frame_np, enable_smoothing, enable_blink, smoothing_strength,
+                    mp_input_size=0):
+        """
+        Locate, smooth and blink-check the eyes in one frame using MediaPipe Face Mesh.
         
-        # Convert to RGB for MediaPipe
-        frame_rgb = np.array(frame_pil.convert('RGB'))
-        height, width = frame_rgb.shape[:2]
+        Advances the tracker, Kalman and blink state, so frames must be fed in order.
+        
+        Returns:
+            Tuple of (left_eye, right_eye, left_iris, right_iris, is_blinking),
+            or None if no face was found
+        """
+        
+        # The frame is already RGB uint8, as MediaPipe expects
+        height, width = frame_np.shape[:2]
+        
+        # Run the face mesh on a downscaled copy; landmarks come back normalized,
+        # so they are scaled by the original size below either way
+        mp_frame = frame_np
+        scale = mp_input_size / max(height, width) if mp_input_size > 0 else 1.0
+        if scale < 1.0:
+            mp_frame = cv2.resize(
+                frame_np,
+                (max(1, round(width * scale)), max(1, round(height * scale))),
+                interpolation=cv2.INTER_AREA
+            )
         
         # Process with MediaPipe
-        results = self.face_mesh.process(frame_rgb)
+        results = self.face_mesh.process(mp_frame)
         
-        # Create outputs
-        stabilized_pil = frame_pil.copy()
-        eye_mask_pil = Image.new('L', frame_pil.size, 0)
-        debug_pil = frame_pil.copy()
+        if not results.multi_face_landmarks:
+            return None
         
-        if results.multi_face_landmarks:
-            face_landmarks = results.multi_face_landmarks[0]
-            
-            # Extract eye landmarks
-            left_eye_indices = [33, 160, 158, 133, 153, 144]  # Left eye outline
-            right_eye_indices = [362, 385, 387, 263, 373, 380]  # Right eye outline
-            
-            left_iris_indices = [468, 469, 470, 471, 472]  # Left iris
-            right_iris_indices = [473, 474, 475, 476, 477]  # Right iris
-            
-            # Get landmark coordinates
-            left_eye = self._get_landmarks(face_landmarks, left_eye_indices, width, height)
-            right_eye = self._get_landmarks(face_landmarks, right_eye_indices, width, height)
-            left_iris = self._get_landmarks(face_landmarks, left_iris_indices, width, height)
-            right_iris = self._get_landmarks(face_landmarks, right_iris_indices, width, height)
-            
-            # Apply temporal smoothing
-            if enable_smoothing:
-                left_eye = self._apply_smoothing(left_eye, "left_eye", smoothing_strength)
-                right_eye = self._apply_smoothing(right_eye, "right_eye", smoothing_strength)
-                left_iris = self._apply_smoothing(left_iris, "left_iris", smoothing_strength)
-                right_iris = self._apply_smoothing(right_iris, "right_iris", smoothing_strength)
-            
-            # Blink detection
-            is_blinking = False
-            if enable_blink:
-                left_ear = self.blink_detector.calculate_ear(left_eye)
-                right_ear = self.blink_detector.calculate_ear(right_eye)
-                is_blinking = self.blink_detector.detect_blink(left_ear, right_ear)
-            
-            # Create eye mask
-            eye_mask_np = np.zeros((height, width), dtype=np.uint8)
-            
-            # Draw eye regions on mask
-            left_eye_int = left_eye.astype(np.int32)
-            right_eye_int = right_eye.astype(np.int32)
-            
-            cv2.fillPoly(eye_mask_np, [left_eye_int], 255)
-            cv2.fillPoly(eye_mask_np, [right_eye_int], 255)
-            
-            # Dilate mask
-            if dilation > 0:
-                kernel = np.ones((dilation, dilation), np.uint8)
-                eye_mask_np = cv2.dilate(eye_mask_np, kernel, iterations=1)
-            
-            eye_mask_pil = Image.fromarray(eye_mask_np)
-            
-            # Apply eye enhancement
-            if enable_enhancement:
-                stabilized_pil = self._enhance_eyes(
-                    frame_pil, eye_mask_pil, enhancement_strength
-                )
-            
-            # Create debug visualization
-            debug_np = np.array(debug_pil)
-            
-            # Draw eye landmarks
-            for point in left_eye_int:
-                cv2.circle(debug_np, tuple(point), 2, (0, 255, 0), -1)
-            for point in right_eye_int:
-                cv2.circle(debug_np, tuple(point), 2, (0, 255, 0), -1)
-            
-            # Draw iris landmarks
-            for point in left_iris.astype(np.int32):
-                cv2.circle(debug_np, tuple(point), 1, (255, 0, 0), -1)
-            for point in right_iris.astype(np.int32):
-                cv2.circle(debug_np, tuple(point), 1, (255, 0, 0), -1)
-            
-            # Draw blink indicator
-            if is_blinking:
-                cv2.putText(debug_np, "BLINK", (10, 30),
-                           cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 0, 255), 2)
-            
-            debug_pil = Image.fromarray(debug_np)
+        face_landmarks = results.multi_face_landmarks[0]
+        
+        # Get eye and iris landmark coordinates in one pass
+        eye_points = self._get_landmarks(face_landmarks, EYE_LANDMARK_IDX, width, height)
+        
+        # Apply temporal smoothing; every coordinate is an independent filter
+        # with the same settings, so all regions share one bank
+        if enable_smoothing:
+            eye_points = self._apply_smoothing(eye_points, "eyes", smoothing_strength)
+        
+        left_eye, right_eye, left_iris, right_iris = np.split(eye_points, EYE_REGION_SPLITS)
+        
+        # Blink detection
+        is_blinking = False
+        if enable_blink:
+            left_ear = self.blink_detector.calculate_ear(left_eye)
+            right_ear = self.blink_detector.calculate_ear(right_eye)
+            is_blinking = self.blink_detector.detect_blink(left_ear, right_ear)
+        
+        return left_eye, right_eye, left_iris, right_iris, is_blinking
+    
+    def _render_eyes(self, frame_np, eyes, enable_enhancement, enhancement_strength, dilation,
+                     enable_debug=False):
+        """Build the eye mask, enhanced frame and debug overlay from tracked eyes."""
+        left_eye, right_eye, left_iris, right_iris, is_blinking = eyes
+        height, width = frame_np.shape[:2]
+        stabilized_np = frame_np
+        
+        # Create eye mask
+        eye_mask_np = np.zeros((height, width), dtype=np.uint8)
+        
+        # Draw eye regions on mask
+        left_eye_int = left_eye.astype(np.int32)
+        right_eye_int = right_eye.astype(np.int32)
+        
+        cv2.fillPoly(eye_mask_np, [left_eye_int, right_eye_int], 255)
+        
+        # Dilate mask
+        if dilation > 0:
+            eye_mask_np = cv2.dilate(eye_mask_np, self._dilate_kernel, iterations=1)
+        
+        # Apply eye enhancement
+        if enable_enhancement:
+            stabilized_np = self._enhance_eyes(
+                frame_np, eye_mask_np, enhancement_strength
+            )
+        
+        # Without debug the original frame is passed through untouched
+        if not enable_debug:
+            return stabilized_np, eye_mask_np, frame_np
+        
+        # Create debug visualization on its own copy of the frame
+        debug_np = frame_np.copy()
         
-        return stabilized_pil, eye_mask_pil, debug_pil
+        # Draw eye outlines (both eyes in one call)
+        cv2.polylines(debug_np, [left_eye_int, right_eye_int], True, (0, 255, 0), 1)
+        
+        # Draw iris outlines (first iris point is the center, the rest the rim)
+        cv2.polylines(debug_np, [left_iris[1:].astype(np.int32), right_iris[1:].astype(np.int32)],
+                      True, (255, 0, 0), 1)
+        
+        # Draw blink indicator
+        if is_blinking:
+            cv2.putText(debug_np, "BLINK", (10, 30),
+                       cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 0, 255), 2)
+        
+        return stabilized_np, eye_mask_np, debug_np
+    
+    def _get_face_mesh(self):
+        """Return the process-wide FaceMesh graph, creating it on first use."""
+        cls = type(self)
+        with cls._face_mesh_lock:
+            if cls._shared_face_mesh is None:
+                cls._shared_face_mesh = self.mp_face_mesh.FaceMesh(
+                    static_image_mode=False,
+                    max_num_faces=1,
+                    refine_landmarks=True,  # Get iris landmarks
+                    min_detection_confidence=0.5,
+                    min_tracking_confidence=0.5
+                )
+                atexit.register(cls._shared_face_mesh.close)
+        return cls._shared_face_mesh
     
     def _get_landmarks(self, face_landmarks, indices, width, height):
-        """Extract landmark coordinates."""
-        landmarks = []
-        for idx in indices:
-            landmark = face_landmarks.landmark[idx]
-            x = int(landmark.x * width)
-            y = int(landmark.y * height)
-            landmarks.append([x, y])
-        return np.array(landmarks, dtype=np.float32)
+        """Extract landmark coordinates (truncated to whole pixels)."""
+        landmark = face_landmarks.landmark
+        xy = np.array([(landmark[idx].x, landmark[idx].y) for idx in indices.tolist()], dtype=np.float64)
+        xy *= (width, height)
+        return xy.astype(np.int32).astype(np.float32)
     
     def _apply_smoothing(self, landmarks, key, strength):
-        """Apply Kalman filtering to landmarks."""
-        smoothed = []
-        
-        for i, (x, y) in enumerate(landmarks):
-            filter_key_x = f"{key}_{i}_x"
-            filter_key_y = f"{key}_{i}_y"
-            
-            # Initialize filters if needed
-            if filter_key_x not in self.landmark_filters:
-                variance = 1e-3 * (1 - strength)  # Lower variance = more smoothing
-                self.landmark_filters[filter_key_x] = KalmanFilter1D(
-                    process_variance=variance,
-                    measurement_variance=1e-1
-                )
-                self.landmark_filters[filter_key_y] = KalmanFilter1D(
-                    process_variance=variance,
-                    measurement_variance=1e-1
-                )
-            
-            # Apply filtering
-            smoothed_x = self.landmark_filters[filter_key_x].update(x)
-            smoothed_y = self.landmark_filters[filter_key_y].update(y)
-            smoothed.append([smoothed_x, smoothed_y])
-        
-        return np.array(smoothed, dtype=np.float32)
+        """Apply Kalman filtering to landmarks, one filter bank per key."""
+        if key not in self.filter_state:
+            self.filter_state[key] = VectorKalman1D(
+                landmarks.shape,
+                process_variance=1e-3 * (1 - strength)  # Lower variance = more smoothing
+            )
+        return self.filter_state[key].update(landmarks)
     
-    def _enhance_eyes(self, frame_pil, eye_mask_pil, strength):
-        """Enhance eye regions using mask."""
-        # Convert to numpy
-        frame_np = np.array(frame_pil)
-        mask_np = np.array(eye_mask_pil) / 255.0
-        
-        # Create sharpened version
-        frame_sharp = frame_pil.filter(ImageFilter.SHARPEN)
-        frame_sharp_np = np.array(frame_sharp)
-        
-        # Apply additional sharpening
-        enhancer = ImageEnhance.Sharpness(Image.fromarray(frame_sharp_np))
-        frame_sharp = enhancer.enhance(strength)
-        frame_sharp_np = np.array(frame_sharp)
-        
-        # Blend using mask
-        mask_3ch = np.stack([mask_np] * 3, axis=-1)
-        blended_np = (frame_sharp_np * mask_3ch + frame_np * (1 - mask_3ch)).astype(np.uint8)
-        
-        return Image.fromarray(blended_np)
+    def _enhance_eyes(self, frame_np, eye_mask_np, strength):
+        """Enhance eye regions of a uint8 frame using mask."""
+        # float32 is plenty for 8-bit blending and halves memory traffic vs float64
+        mask_np = eye_mask_np.astype(np.float32) * np.float32(1.0 / 255.0)
+        
+        # Sharpen + additional sharpening in a single SIMD filter pass
+        frame_sharp_np = cv2.filter2D(
+            frame_np, -1, _eye_sharpen_kernel(float(strength)), borderType=cv2.BORDER_REPLICATE
+        )
+        
+        # Blend using mask, broadcast over channels as (H, W, 1)
+        alpha = mask_np[..., None]
+        blended_np = (
+            frame_sharp_np.astype(np.float32) * alpha
+            + frame_np.astype(np.float32) * (1 - alpha)
+        ).astype(np.uint8)
+        
+        return blended_np
     
-    def _enhance_image(self, image_pil, strength):
+    def _enhance_image(self, frame_np, strength):
         """Basic image enhancement fallback."""
-        enhancer = ImageEnhance.Sharpness(image_pil)
-        return enhancer.enhance(strength)
+        enhancer = ImageEnhance.Sharpness(Image.fromarray(frame_np))
+        return np.asarray(enhancer.enhance(strength))
     
-    def _pil_to_tensor(self, pil_image):
-        """Convert PIL Image to ComfyUI tensor."""
-        np_image = np.array(pil_image).astype(np.float32) / 255.0
-        tensor = torch.from_numpy(np_image)
-        return tensor
+    def _np_to_tensor(self, np_image):
+        """Convert a uint8 ndarray to a ComfyUI tensor in a single float conversion."""
+        return torch.from_numpy(np_image).to(torch.float32).div_(255.0)
     
-    def _tensor_to_pil(self, tensor):
-        """Convert ComfyUI tensor to PIL Image."""
-        if len(tensor.shape) == 4:
-            tensor = tensor[0]
-        np_image = (tensor.cpu().numpy() * 255).astype(np.uint8)
-        return Image.fromarray(np_image)
+    def _tensor_to_uint8(self, images):
+        """Convert a ComfyUI image batch [B, H, W, C] to a contiguous uint8 ndarray."""
+        return images.detach().mul(255).clamp_(0, 255).to(torch.uint8).cpu().contiguous().numpy()
 
 
 # Node registration
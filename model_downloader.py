@@ -1,171 +1,688 @@
 import os
-import subprocess
+import asyncio
+import ctypes
+import functools
+import hashlib
+import json
+import random
+import socket
+import sys
+from typing import Optional
+from dataclasses import dataclass
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlparse
 import folder_paths
+import aiohttp
 from aiohttp import web
-import asyncio
+from aiohttp.abc import AbstractResolver
+
+try:
+    import aiodns
+except ImportError:
+    aiodns = None
+
+
+CHUNK_SIZE = 1 << 20
+MIB = float(1 << 20)
+
+# Downloads running at once, overall and against any single host
+MAX_CONCURRENT_DOWNLOADS = 6
+MAX_DOWNLOADS_PER_HOST = 4
+
+# Files at least this large are fetched over several connections at once
+RANGED_MIN_SIZE = 256 << 20
+RANGED_SPLITS = 4
+
+# Minimum seconds between saves of a ranged download's per-range progress
+RANGED_STATE_INTERVAL = 1.0
+
+# Minimum seconds between progress lines for one download
+PROGRESS_INTERVAL = 0.5
+
+# Response writes are batched up to this size or delay
+FLUSH_BYTES = 8192
+FLUSH_INTERVAL = 0.25
+
+# Transient failures are retried with capped exponential backoff plus jitter
+MAX_ATTEMPTS = 5
+RETRY_MAX_DELAY = 30
+
+# Threads doing download disk I/O
+DISK_WORKERS = 4
+
+# Linux fallocate(2), used to reserve space for a download up front
+FALLOC_FL_KEEP_SIZE = 0x01
+_fallocate = None
+if sys.platform.startswith("linux"):
+    try:
+        _fallocate = ctypes.CDLL(None, use_errno=True).fallocate
+        _fallocate.argtypes = (ctypes.c_int, ctypes.c_int, ctypes.c_int64, ctypes.c_int64)
+        _fallocate.restype = ctypes.c_int
+    except (OSError, AttributeError, TypeError):
+        _fallocate = None
+
+
+@dataclass(frozen=True)
+class Model:
+    url: str
+    path: str
+    name: str
+    sha256: Optional[str] = None  # Expected hash; verified when set
 
 
 class ModelDownloader:
-    MODELS = [
-        {
-            "url": "https://huggingface.co/xinsir/controlnet-union-sdxl-1.0/resolve/main/diffusion_pytorch_model_promax.safetensors",
-            "path": "controlnet/diffusion_pytorch_model_promax.safetensors",
-            "name": "ControlNet Union SDXL"
-        },
-        {
-            "url": "https://huggingface.co/datasets/Gourieff/ReActor/resolve/main/models/facerestore_models/GFPGANv1.3.pth",
-            "path": "facerestore_models/GFPGANv1.3.pth",
-            "name": "GFPGAN Face Restore"
-        },
-        {
-            "url": "https://huggingface.co/thesudio/clip_vision_SDXL_vit-h.safetensors/resolve/main/SDXLopen_clip_pytorch_model_vit_h.safetensors",
-            "path": "clip_vision/SDXLopen_clip_pytorch_model_vit_h.safetensors",
-            "name": "CLIP Vision SDXL"
-        },
-        {
-            "url": "https://huggingface.co/pmabtz/gonzalomoXLFluxPony_v60PhotoXLDMD.safetensors/resolve/main/gonzalomoXLFluxPony_v60PhotoXLDMD.safetensors",
-            "path": "checkpoints/gonzalomoXLFluxPony_v60PhotoXLDMD.safetensors",
-            "name": "GonzalomoXL Checkpoint"
-        },
-        {
-            "url": "https://www.dropbox.com/scl/fi/gz7e4zv3v6rh2l82uals5/ip-adapter-faceid-plusv2_sdxl.bin?rlkey=lk1yw94ndgfxggxohu136eki0&st=98jiced8&dl=0",
-            "path": "ipadapter/ip-adapter-faceid-plusv2_sdxl.bin",
-            "name": "IP-Adapter FaceID Plus v2"
-        },
-        {
-            "url": "https://www.dropbox.com/scl/fi/xsflrbsfnl95gnagfxo44/SwinIR_4x.pth?rlkey=4fny62ak5fymel7h16ctnguaw&st=6jp0cxo4&dl=0",
-            "path": "upscale_models/SwinIR_4x.pth",
-            "name": "SwinIR 4x Upscaler"
-        },
-        {
-            "url": "https://www.dropbox.com/scl/fi/gwghcy1adp1mloxnppqou/epiCNegative.pt?rlkey=f2zz5zzbgg984835mojueao65&st=03dalxxr&dl=0",
-            "path": "embeddings/epiCNegative.pt",
-            "name": "EpiC Negative Embedding"
-        },
-        {
-            "url": "https://www.dropbox.com/scl/fi/h0pi6xyjozna49kophedo/ng_deepnegative_v1_75t.pt?rlkey=1ndqdpixtfhte6odhnq155tmy&st=hf53oek5&dl=0",
-            "path": "embeddings/ng_deepnegative_v1_75t.pt",
-            "name": "Deep Negative Embedding"
-        },
-        {
-            "url": "https://huggingface.co/Comfy-Org/Wan_2.1_ComfyUI_repackaged/resolve/main/split_files/clip_vision/clip_vision_h.safetensors",
-            "path": "clip_vision/clip_vision_h.safetensors",
-            "name": "clip_vision_h"
-        },
-        {
-            "url": "https://huggingface.co/Kijai/WanVideo_comfy_fp8_scaled/resolve/main/T2V/Wan2_2-T2V-A14B-LOW_fp8_e4m3fn_scaled_KJ.safetensors",
-            "path": "diffusion_models/Wan2_2-T2V-A14B-LOW_fp8_e4m3fn_scaled_KJ.safetensors",
-            "name": "Wan2_2-T2V-A14B-LOW_fp8_e4m3fn_scaled_KJ"
-        },
-        {
-            "url": "https://huggingface.co/Comfy-Org/Wan_2.2_ComfyUI_Repackaged/resolve/main/split_files/diffusion_models/wan2.2_animate_14B_bf16.safetensors",
-            "path": "diffusion_models/wan2.2_animate_14B_bf16.safetensors",
-            "name": "wan2.2_animate_14B_bf16"
-        },
-        {
-            "url": "https://huggingface.co/Comfy-Org/Wan_2.2_ComfyUI_Repackaged/resolve/main/split_files/diffusion_models/wan2.2_t2v_low_noise_14B_fp16.safetensors",
-            "path": "diffusion_models/wan2.2_t2v_low_noise_14B_fp16.safetensors",
-            "name": "wan2.2_t2v_low_noise_14B_fp16"
-        },
-        {
-            "url": "https://github.com/deepinsight/insightface/releases/download/v0.7/buffalo_l.zip",
-            "path": "insightface/models/buffalo_l.zip",
-            "name": "buffalo_l"
-        },
-        {
-            "url": "https://huggingface.co/h94/IP-Adapter/resolve/main/sdxl_models/ip-adapter-plus_sdxl_vit-h.safetensors",
-            "path": "ipadapter/ip-adapter-plus_sdxl_vit-h.safetensors",
-            "name": "ip-adapter-plus_sdxl_vit-h"
-        },
-        {
-            "url": "https://huggingface.co/Kutches/UncensoredV2/resolve/main/Wan22_A14B_T2V_LOW_Lightning_4steps_lora_250928_rank64_fp16.safetensors",
-            "path": "loras/Wan22_A14B_T2V_LOW_Lightning_4steps_lora_250928_rank64_fp16.safetensors",
-            "name": "Wan22_A14B_T2V_LOW_Lightning_4steps_lora_250928_rank64_fp16"
-        },
-        {
-            "url": "https://huggingface.co/Kijai/WanVideo_comfy/resolve/main/Lightx2v/lightx2v_I2V_14B_480p_cfg_step_distill_rank64_bf16.safetensors",
-            "path": "loras/lightx2v_I2V_14B_480p_cfg_step_distill_rank64_bf16.safetensors",
-            "name": "lightx2v_I2V_14B_480p_cfg_step_distill_rank64_bf16"
-        },
-        {
-            "url": "https://huggingface.co/Comfy-Org/Wan_2.2_ComfyUI_Repackaged/resolve/main/split_files/loras/wan2.2_animate_14B_relight_lora_bf16.safetensors",
-            "path": "loras/wan2.2_animate_14B_relight_lora_bf16.safetensors",
-            "name": "wan2.2_animate_14B_relight_lora_bf16"
-        },
-        {
-            "url": "https://huggingface.co/lightx2v/Wan2.2-Distill-Loras/resolve/main/wan2.2_i2v_A14b_low_noise_lora_rank64_lightx2v_4step_1022.safetensors",
-            "path": "loras/wan2.2_i2v_A14b_low_noise_lora_rank64_lightx2v_4step_1022.safetensors",
-            "name": "wan2.2_i2v_A14b_low_noise_lora_rank64_lightx2v_4step_1022"
-        },
-        {
-            "url": "https://huggingface.co/Comfy-Org/Wan_2.1_ComfyUI_repackaged/resolve/main/split_files/text_encoders/umt5_xxl_fp8_e4m3fn_scaled.safetensors",
-            "path": "text_encoders/umt5_xxl_fp8_e4m3fn_scaled.safetensors",
-            "name": "umt5_xxl_fp8_e4m3fn_scaled"
-        },
-        {
-            "url": "https://huggingface.co/Kijai/WanVideo_comfy/resolve/main/umt5-xxl-enc-bf16.safetensors",
-            "path": "text_encoders/umt5-xxl-enc-bf16.safetensors",
-            "name": "umt5-xxl-enc-bf16"
-        },
-        {
-            "url": "https://huggingface.co/lllyasviel/Annotators/resolve/main/RealESRGAN_x4plus.pth",
-            "path": "upscale_models/RealESRGAN_x4plus.pth",
-            "name": "RealESRGAN_x4plus"
-        },
-        {
-            "url": "https://huggingface.co/Comfy-Org/Wan_2.1_ComfyUI_repackaged/resolve/main/split_files/vae/wan_2.1_vae.safetensors",
-            "path": "vae/wan_2.1_vae.safetensors",
-            "name": "wan2.1_vae"
-        }
-    ]
+    MODELS = (
+        Model(
+            url="https://huggingface.co/xinsir/controlnet-union-sdxl-1.0/resolve/main/diffusion_pytorch_model_promax.safetensors",
+            path="controlnet/diffusion_pytorch_model_promax.safetensors",
+            name="ControlNet Union SDXL",
+        ),
+        Model(
+            url="https://huggingface.co/datasets/Gourieff/ReActor/resolve/main/models/facerestore_models/GFPGANv1.3.pth",
+            path="facerestore_models/GFPGANv1.3.pth",
+            name="GFPGAN Face Restore",
+        ),
+        Model(
+            url="https://huggingface.co/thesudio/clip_vision_SDXL_vit-h.safetensors/resolve/main/SDXLopen_clip_pytorch_model_vit_h.safetensors",
+            path="clip_vision/SDXLopen_clip_pytorch_model_vit_h.safetensors",
+            name="CLIP Vision SDXL",
+        ),
+        Model(
+            url="https://huggingface.co/pmabtz/gonzalomoXLFluxPony_v60PhotoXLDMD.safetensors/resolve/main/gonzalomoXLFluxPony_v60PhotoXLDMD.safetensors",
+            path="checkpoints/gonzalomoXLFluxPony_v60PhotoXLDMD.safetensors",
+            name="GonzalomoXL Checkpoint",
+        ),
+        Model(
+            url="https://www.dropbox.com/scl/fi/gz7e4zv3v6rh2l82uals5/ip-adapter-faceid-plusv2_sdxl.bin?rlkey=lk1yw94ndgfxggxohu136eki0&st=98jiced8&dl=0",
+            path="ipadapter/ip-adapter-faceid-plusv2_sdxl.bin",
+            name="IP-Adapter FaceID Plus v2",
+        ),
+        Model(
+            url="https://www.dropbox.com/scl/fi/xsflrbsfnl95gnagfxo44/SwinIR_4x.pth?rlkey=4fny62ak5fymel7h16ctnguaw&st=6jp0cxo4&dl=0",
+            path="upscale_models/SwinIR_4x.pth",
+            name="SwinIR 4x Upscaler",
+        ),
+        Model(
+            url="https://www.dropbox.com/scl/fi/gwghcy1adp1mloxnppqou/epiCNegative.pt?rlkey=f2zz5zzbgg984835mojueao65&st=03dalxxr&dl=0",
+            path="embeddings/epiCNegative.pt",
+            name="EpiC Negative Embedding",
+        ),
+        Model(
+            url="https://www.dropbox.com/scl/fi/h0pi6xyjozna49kophedo/ng_deepnegative_v1_75t.pt?rlkey=1ndqdpixtfhte6odhnq155tmy&st=hf53oek5&dl=0",
+            path="embeddings/ng_deepnegative_v1_75t.pt",
+            name="Deep Negative Embedding",
+        ),
+        Model(
+            url="https://huggingface.co/Comfy-Org/Wan_2.1_ComfyUI_repackaged/resolve/main/split_files/clip_vision/clip_vision_h.safetensors",
+            path="clip_vision/clip_vision_h.safetensors",
+            name="clip_vision_h",
+        ),
+        Model(
+            url="https://huggingface.co/Kijai/WanVideo_comfy_fp8_scaled/resolve/main/T2V/Wan2_2-T2V-A14B-LOW_fp8_e4m3fn_scaled_KJ.safetensors",
+            path="diffusion_models/Wan2_2-T2V-A14B-LOW_fp8_e4m3fn_scaled_KJ.safetensors",
+            name="Wan2_2-T2V-A14B-LOW_fp8_e4m3fn_scaled_KJ",
+        ),
+        Model(
+            url="https://huggingface.co/Comfy-Org/Wan_2.2_ComfyUI_Repackaged/resolve/main/split_files/diffusion_models/wan2.2_animate_14B_bf16.safetensors",
+            path="diffusion_models/wan2.2_animate_14B_bf16.safetensors",
+            name="wan2.2_animate_14B_bf16",
+        ),
+        Model(
+            url="https://huggingface.co/Comfy-Org/Wan_2.2_ComfyUI_Repackaged/resolve/main/split_files/diffusion_models/wan2.2_t2v_low_noise_14B_fp16.safetensors",
+            path="diffusion_models/wan2.2_t2v_low_noise_14B_fp16.safetensors",
+            name="wan2.2_t2v_low_noise_14B_fp16",
+        ),
+        Model(
+            url="https://github.com/deepinsight/insightface/releases/download/v0.7/buffalo_l.zip",
+            path="insightface/models/buffalo_l.zip",
+            name="buffalo_l",
+        ),
+        Model(
+            url="https://huggingface.co/h94/IP-Adapter/resolve/main/sdxl_models/ip-adapter-plus_sdxl_vit-h.safetensors",
+            path="ipadapter/ip-adapter-plus_sdxl_vit-h.safetensors",
+            name="ip-adapter-plus_sdxl_vit-h",
+        ),
+        Model(
+            url="https://huggingface.co/Kutches/UncensoredV2/resolve/main/Wan22_A14B_T2V_LOW_Lightning_4steps_lora_250928_rank64_fp16.safetensors",
+            path="loras/Wan22_A14B_T2V_LOW_Lightning_4steps_lora_250928_rank64_fp16.safetensors",
+            name="Wan22_A14B_T2V_LOW_Lightning_4steps_lora_250928_rank64_fp16",
+        ),
+        Model(
+            url="https://huggingface.co/Kijai/WanVideo_comfy/resolve/main/Lightx2v/lightx2v_I2V_14B_480p_cfg_step_distill_rank64_bf16.safetensors",
+            path="loras/lightx2v_I2V_14B_480p_cfg_step_distill_rank64_bf16.safetensors",
+            name="lightx2v_I2V_14B_480p_cfg_step_distill_rank64_bf16",
+        ),
+        Model(
+            url="https://huggingface.co/Comfy-Org/Wan_2.2_ComfyUI_Repackaged/resolve/main/split_files/loras/wan2.2_animate_14B_relight_lora_bf16.safetensors",
+            path="loras/wan2.2_animate_14B_relight_lora_bf16.safetensors",
+            name="wan2.2_animate_14B_relight_lora_bf16",
+        ),
+        Model(
+            url="https://huggingface.co/lightx2v/Wan2.2-Distill-Loras/resolve/main/wan2.2_i2v_A14b_low_noise_lora_rank64_lightx2v_4step_1022.safetensors",
+            path="loras/wan2.2_i2v_A14b_low_noise_lora_rank64_lightx2v_4step_1022.safetensors",
+            name="wan2.2_i2v_A14b_low_noise_lora_rank64_lightx2v_4step_1022",
+        ),
+        Model(
+            url="https://huggingface.co/Comfy-Org/Wan_2.1_ComfyUI_repackaged/resolve/main/split_files/text_encoders/umt5_xxl_fp8_e4m3fn_scaled.safetensors",
+            path="text_encoders/umt5_xxl_fp8_e4m3fn_scaled.safetensors",
+            name="umt5_xxl_fp8_e4m3fn_scaled",
+        ),
+        Model(
+            url="https://huggingface.co/Kijai/WanVideo_comfy/resolve/main/umt5-xxl-enc-bf16.safetensors",
+            path="text_encoders/umt5-xxl-enc-bf16.safetensors",
+            name="umt5-xxl-enc-bf16",
+        ),
+        Model(
+            url="https://huggingface.co/lllyasviel/Annotators/resolve/main/RealESRGAN_x4plus.pth",
+            path="upscale_models/RealESRGAN_x4plus.pth",
+            name="RealESRGAN_x4plus",
+        ),
+        Model(
+            url="https://huggingface.co/Comfy-Org/Wan_2.1_ComfyUI_repackaged/resolve/main/split_files/vae/wan_2.1_vae.safetensors",
+            path="vae/wan_2.1_vae.safetensors",
+            name="wan2.1_vae",
+        ),
+    )
 
     @staticmethod
-    async def download_models_stream(response):
-        base_dir = folder_paths.base_path
+    async def download_models_stream(response, session=None):
+        if session is None:
+            session = _get_session()
+        resolved = _resolved_models()
+        total_models = len(resolved)
+        if session is _session:
+            # Look up every host at once instead of on each host's first request
+            _resolver.prefetch(model.url for _, model, _ in resolved)
+        for directory in {os.path.dirname(full_path) for _, _, full_path in resolved}:
+            os.makedirs(directory, exist_ok=True)
         
-        for idx, model in enumerate(ModelDownloader.MODELS, 1):
-            full_path = os.path.join(base_dir, "models", model["path"])
-            os.makedirs(os.path.dirname(full_path), exist_ok=True)
-            
+        # Several models download at once; progress from the concurrent
+        # tasks is batched onto the single streamed response
+        writer = _BatchedWriter(response)
+        write = writer.write
+        download_slots = asyncio.Semaphore(MAX_CONCURRENT_DOWNLOADS)
+        host_slots = defaultdict(lambda: asyncio.Semaphore(MAX_DOWNLOADS_PER_HOST))
+        
+        async def fetch(idx, model, full_path, session):
             if os.path.exists(full_path):
-                msg = f"[{idx}/{len(ModelDownloader.MODELS)}] ⏭️  Skipping {model['name']} (already exists)\n"
-                await response.write(msg.encode())
-                continue
-            
-            msg = f"[{idx}/{len(ModelDownloader.MODELS)}] 📥 Downloading {model['name']}...\n"
-            await response.write(msg.encode())
+                if not model.sha256 or await _sha256_matches(full_path, model.sha256):
+                    msg = f"[{idx}/{total_models}] ⏭️  Skipping {model.name} (already exists)\n"
+                    await write(msg.encode())
+                    return
+                msg = f"[{idx}/{total_models}] ⚠️  {model.name} failed its checksum, downloading again\n"
+                await write(msg.encode())
+                os.remove(full_path)
             
-            try:
-                process = await asyncio.create_subprocess_exec(
-                    "wget", "-q", "--show-progress", "-c", "-O", full_path, model["url"],
-                    stdout=asyncio.subprocess.PIPE,
-                    stderr=asyncio.subprocess.PIPE
-                )
-                
-                while True:
-                    line = await process.stderr.readline()
-                    if not line:
-                        break
-                    await response.write(line)
-                
-                await process.wait()
+            for attempt in range(1, MAX_ATTEMPTS + 1):
+                # Host slot first: a task queued behind its host must not
+                # hold one of the global slots other hosts could use
+                async with host_slots[urlparse(model.url).hostname], download_slots:
+                    if attempt == 1:
+                        msg = f"[{idx}/{total_models}] 📥 Downloading {model.name}...\n"
+                        await write(msg.encode())
+                    
+                    try:
+                        await ModelDownloader._download(
+                            session, model.url, full_path, model.name, write, model.sha256)
+                        msg = f"✅ {model.name} downloaded successfully\n\n"
+                    except Exception as e:
+                        if attempt < MAX_ATTEMPTS and _is_transient(e):
+                            error = e
+                            msg = None
+                        elif isinstance(e, aiohttp.ClientResponseError):
+                            msg = f"❌ {model.name} failed to download (HTTP {e.status})\n\n"
+                        else:
+                            msg = f"❌ Error downloading {model.name}: {str(e)}\n\n"
+                    if msg is not None:
+                        await write(msg.encode())
+                        return
                 
-                if process.returncode == 0:
-                    msg = f"✅ {model['name']} downloaded successfully\n\n"
-                else:
-                    msg = f"❌ {model['name']} failed to download\n\n"
-                await response.write(msg.encode())
-                
-            except FileNotFoundError:
-                msg = "❌ wget command not found. Please install wget.\n"
-                await response.write(msg.encode())
-                return
-            except Exception as e:
-                msg = f"❌ Error downloading {model['name']}: {str(e)}\n\n"
-                await response.write(msg.encode())
+                # Back off outside the download slots so other models can use them;
+                # the next attempt resumes from the .part file
+                delay = min(RETRY_MAX_DELAY, 2 ** attempt) + random.random()
+                msg = f"🔁 {model.name}: {_describe_error(error)}, retrying in {delay:.0f}s ({attempt}/{MAX_ATTEMPTS - 1})\n"
+                await write(msg.encode())
+                await asyncio.sleep(delay)
+        
+        await asyncio.gather(*(
+            fetch(idx, model, full_path, session)
+            for idx, model, full_path in resolved
+        ))
         
         final_msg = "\n🎉 Download process completed!\n"
-        await response.write(final_msg.encode())
+        await write(final_msg.encode())
+        await writer.flush()
+
+    @staticmethod
+    async def _download(session, url, full_path, name, write, sha256=None):
+        """
+        Stream url into full_path, reporting progress through write.
+        
+        Data goes to "<full_path>.part" and is renamed into place once
+        complete. An existing .part file is resumed with a Range request,
+        like wget -c. The finished file is checked against sha256, or the
+        hash Hugging Face reports for LFS files when none is given.
+        
+        Ranged downloads use "<full_path>.ranged" instead, with each range's
+        progress kept next to it in "<full_path>.ranged.json" so they resume
+        too; see _ranged_download.
+        """
+        part_path = full_path + ".part"
+        ranged_path = full_path + ".ranged"
+        offset = os.path.getsize(part_path) if os.path.exists(part_path) else 0
+        
+        if not offset:
+            ranged_url, size, linked_sha256 = await ModelDownloader._probe_ranged(session, url)
+            if ranged_url:
+                await ModelDownloader._ranged_download(session, ranged_url, ranged_path, size, name, write)
+                await _finalize(ranged_path, full_path, sha256 or linked_sha256)
+                return
+        # Going single-stream: a leftover ranged download is of no use
+        _discard_ranged(ranged_path)
+        
+        headers = {"Range": f"bytes={offset}-"} if offset else None
+        
+        async with session.get(url, headers=headers) as resp:
+            sha256 = sha256 or _linked_sha256(resp)
+            if resp.status == 416 and offset:
+                # Nothing left past the partial file: it is already complete
+                await _finalize(part_path, full_path, sha256)
+                return
+            resp.raise_for_status()
+            
+            if resp.status != 206:
+                offset = 0  # Server ignored the range, start over
+            total = offset + resp.content_length if resp.content_length is not None else None
+            progress = _Progress(name, total, write, offset)
+            loop = asyncio.get_running_loop()
+            
+            with open(part_path, "ab" if offset else "wb") as f:
+                if total:
+                    _reserve_space(f.fileno(), offset, total - offset)
+                async for chunk in resp.content.iter_chunked(CHUNK_SIZE):
+                    await loop.run_in_executor(_DISK_POOL, f.write, chunk)
+                    await progress.advance(len(chunk))
+                f.flush()
+                await loop.run_in_executor(_DISK_POOL, _sync, f.fileno())
+        
+        await _finalize(part_path, full_path, sha256)
+
+    @staticmethod
+    async def _probe_ranged(session, url):
+        """
+        Return (final_url, size, sha256) if url is worth a multi-connection download.
+        
+        The server has to advertise byte ranges and the file has to be at
+        least RANGED_MIN_SIZE; otherwise (None, None, None) is returned.
+        Platforms without os.pwrite (Windows) always get a single stream.
+        """
+        if not hasattr(os, "pwrite"):
+            return None, None, None
+        try:
+            async with session.head(url, allow_redirects=True) as resp:
+                if (resp.status != 200 or resp.headers.get("Accept-Ranges") != "bytes"
+                        or resp.content_length is None or resp.content_length < RANGED_MIN_SIZE):
+                    return None, None, None
+                return str(resp.url), resp.content_length, _linked_sha256(resp)
+        except aiohttp.ClientError:
+            return None, None, None
+
+    @staticmethod
+    async def _ranged_download(session, url, path, size, name, write):
+        """
+        Fetch url into a preallocated path as RANGED_SPLITS parallel byte ranges.
+        
+        The ranges are written at their offsets with os.pwrite on the disk
+        pool. Each range retries transient failures on its own, picking up
+        from the last byte it wrote. How far every range got is saved to
+        "<path>.json" as it goes, so a download that still fails (or is
+        interrupted) resumes from there next time instead of from zero.
+        """
+        loop = asyncio.get_running_loop()
+        state_path = path + ".json"
+        ranges = _load_ranges(state_path, path, size)
+        if ranges is None:
+            step = -(-size // RANGED_SPLITS)
+            ranges = [[start, min(start + step, size) - 1] for start in range(0, size, step)]
+            fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+            try:
+                os.posix_fallocate(fd, 0, size)
+            except (AttributeError, OSError):
+                os.ftruncate(fd, size)
+        else:
+            fd = os.open(path, os.O_WRONLY)
+        
+        # Each range is [next byte to fetch, last byte]
+        remaining = sum(end + 1 - start for start, end in ranges)
+        progress = _Progress(name, size, write, size - remaining)
+        save_lock = asyncio.Lock()
+        last_save = loop.time()
+        
+        async def save_ranges():
+            nonlocal last_save
+            async with save_lock:
+                last_save = loop.time()
+                await loop.run_in_executor(_DISK_POOL, _save_ranges, state_path, size, ranges)
+        
+        async def fetch_range(rng):
+            attempt = 1
+            while rng[0] <= rng[1]:
+                try:
+                    async with session.get(url, headers={"Range": f"bytes={rng[0]}-{rng[1]}"}) as resp:
+                        resp.raise_for_status()
+                        if resp.status != 206:
+                            raise aiohttp.ClientPayloadError(f"server ignored range {rng[0]}-{rng[1]}")
+                        async for chunk in resp.content.iter_chunked(CHUNK_SIZE):
+                            await loop.run_in_executor(_DISK_POOL, os.pwrite, fd, chunk, rng[0])
+                            rng[0] += len(chunk)
+                            await progress.advance(len(chunk))
+                            if loop.time() - last_save >= RANGED_STATE_INTERVAL:
+                                await save_ranges()
+                    if rng[0] <= rng[1]:
+                        raise aiohttp.ClientPayloadError(f"range ended early at byte {rng[0]}")
+                except Exception as e:
+                    if attempt >= MAX_ATTEMPTS or not _is_transient(e):
+                        raise
+                    delay = min(RETRY_MAX_DELAY, 2 ** attempt) + random.random()
+                    msg = f"🔁 {name}: {_describe_error(e)}, resuming bytes {rng[0]}-{rng[1]} in {delay:.0f}s\n"
+                    await write(msg.encode())
+                    await asyncio.sleep(delay)
+                    attempt += 1
+        
+        try:
+            await save_ranges()
+            tasks = [asyncio.ensure_future(fetch_range(rng)) for rng in ranges]
+            try:
+                await asyncio.gather(*tasks)
+            except BaseException:
+                for task in tasks:
+                    task.cancel()
+                await asyncio.gather(*tasks, return_exceptions=True)
+                # Keep the file and record how far each range got for next time
+                await asyncio.shield(save_ranges())
+                raise
+            await loop.run_in_executor(_DISK_POOL, _sync, fd)
+        finally:
+            os.close(fd)
+        os.remove(state_path)
+
+
+def _load_ranges(state_path, path, size):
+    """
+    Return the saved ranges of an unfinished ranged download, or None.
+    
+    Leftovers that don't belong to a size byte download (the file changed
+    upstream, or the progress file is missing or unreadable) are discarded.
+    """
+    try:
+        with open(state_path) as f:
+            state = json.load(f)
+        if state["size"] == size and os.path.getsize(path) == size:
+            return [[int(start), int(end)] for start, end in state["ranges"]]
+    except (OSError, ValueError, KeyError, TypeError):
+        pass
+    _discard_ranged(path)
+    return None
+
+
+def _save_ranges(state_path, size, ranges):
+    # Written aside and swapped in, so a crash never leaves a torn progress file
+    tmp_path = state_path + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump({"size": size, "ranges": ranges}, f)
+    os.replace(tmp_path, state_path)
+
+
+def _discard_ranged(path):
+    """Remove a ranged download's file and its progress file, if present."""
+    for leftover in (path, path + ".json"):
+        try:
+            os.remove(leftover)
+        except FileNotFoundError:
+            pass
+
+
+def _reserve_space(fd, offset, length):
+    """
+    Reserve disk blocks for length bytes at offset without growing the file.
+    
+    Unlike os.posix_fallocate this keeps the file size at what has actually
+    been written, so an interrupted .part file still resumes correctly.
+    Best effort: silently does nothing where fallocate is unavailable.
+    """
+    if _fallocate is not None and length > 0:
+        _fallocate(fd, FALLOC_FL_KEEP_SIZE, offset, length)
+
+
+def _sync(fd):
+    # One flush to disk per finished file rather than per chunk
+    if hasattr(os, "fdatasync"):
+        os.fdatasync(fd)
+    else:
+        os.fsync(fd)
+
+
+class _PrefetchResolver(AbstractResolver):
+    """
+    DNS resolver whose lookups can be started ahead of the first request.
+    
+    prefetch() resolves every host concurrently; the connector's first
+    lookup for a host then picks up the finished (or in-flight) result, and
+    later ones hit the connector's own DNS cache. Uses aiodns when it is
+    installed and the threaded getaddrinfo resolver otherwise.
+    """
+    
+    def __init__(self):
+        self._resolver = aiohttp.AsyncResolver() if aiodns is not None else aiohttp.ThreadedResolver()
+        self._prefetched = {}
+    
+    def prefetch(self, urls):
+        for url in urls:
+            parsed = urlparse(url)
+            key = (parsed.hostname, parsed.port or (443 if parsed.scheme == "https" else 80))
+            # A finished lookup nobody used (e.g. every file from that host
+            # already existed) may be long stale by now: resolve again
+            pending = self._prefetched.get(key)
+            if pending is None or pending.done():
+                task = asyncio.ensure_future(self._resolver.resolve(*key, family=socket.AF_UNSPEC))
+                task.add_done_callback(_ignore_result)
+                self._prefetched[key] = task
+    
+    async def resolve(self, host, port=0, family=socket.AF_INET):
+        task = self._prefetched.pop((host, port), None) if family == socket.AF_UNSPEC else None
+        if task is not None:
+            try:
+                return await task
+            except OSError:
+                pass  # Retry below, the failure may have been transient
+        return await self._resolver.resolve(host, port, family)
+    
+    async def close(self):
+        for task in self._prefetched.values():
+            task.cancel()
+        self._prefetched.clear()
+        await self._resolver.close()
+
+
+def _ignore_result(task):
+    # Keep failed prefetches from being logged as unretrieved exceptions
+    if not task.cancelled():
+        task.exception()
+
+
+_session = None
+_resolver = None
+
+# Blocking file writes and syncs run here so they never stall the event loop
+_DISK_POOL = ThreadPoolExecutor(max_workers=DISK_WORKERS, thread_name_prefix="model-download-io")
+
+
+def _get_session():
+    """
+    Return the ClientSession shared by all download requests.
+    
+    Keeping one session alive lets repeat downloads from the same host reuse
+    pooled keep-alive connections instead of opening new TCP/TLS ones.
+    """
+    global _session, _resolver
+    if _session is None or _session.closed:
+        _resolver = _PrefetchResolver()
+        _session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(
+                limit=32, limit_per_host=16, ttl_dns_cache=600, keepalive_timeout=75,
+                resolver=_resolver),
+            timeout=aiohttp.ClientTimeout(total=None, sock_read=300),
+        )
+    return _session
+
+
+async def close_session(app=None):
+    """Close the shared download session; usable as an aiohttp on_cleanup hook."""
+    global _session, _resolver
+    if _session is not None:
+        await _session.close()
+        _session = None
+    if _resolver is not None:
+        # The connector does not own a resolver handed to it, so close it here
+        await _resolver.close()
+        _resolver = None
+
+
+@functools.lru_cache(maxsize=None)
+def _resolved_models():
+    """
+    Return (idx, model, full_path) for every entry in MODELS.
+    
+    Resolved on first use rather than at import, since ComfyUI may not have
+    settled folder_paths.base_path yet when this module is loaded. Entries
+    are grouped by host so consecutive downloads reuse warm connections;
+    idx keeps the original MODELS numbering for progress messages.
+    """
+    models_dir = os.path.join(folder_paths.base_path, "models")
+    resolved = (
+        (idx, model, os.path.join(models_dir, model.path))
+        for idx, model in enumerate(ModelDownloader.MODELS, 1)
+    )
+    return tuple(sorted(resolved, key=lambda entry: urlparse(entry[1].url).netloc))
+
+
+def _is_transient(error):
+    """Whether a failed download is worth retrying: server errors, throttling and network trouble."""
+    if isinstance(error, aiohttp.ClientResponseError):
+        return error.status >= 500 or error.status == 429
+    return isinstance(error, (aiohttp.ClientError, asyncio.TimeoutError, ConnectionError))
+
+
+def _describe_error(error):
+    if isinstance(error, aiohttp.ClientResponseError):
+        return f"HTTP {error.status}"
+    return str(error) or type(error).__name__
+
+
+def _linked_sha256(resp):
+    """
+    Return the sha256 Hugging Face advertises for an LFS file, if any.
+    
+    The hub sends it as X-Linked-Etag on the redirect to the CDN, so the
+    redirect history is searched as well as the final response.
+    """
+    for r in (*resp.history, resp):
+        etag = r.headers.get("X-Linked-Etag", "").strip('"')
+        if len(etag) == 64:
+            return etag.lower()
+    return None
+
+
+def _sha256_file(path):
+    with open(path, "rb") as f:
+        if hasattr(hashlib, "file_digest"):
+            return hashlib.file_digest(f, "sha256").hexdigest()
+        digest = hashlib.sha256()
+        for block in iter(lambda: f.read(CHUNK_SIZE), b""):
+            digest.update(block)
+        return digest.hexdigest()
+
+
+async def _sha256_matches(path, expected):
+    # Hashing multi-GB files would stall the event loop, so it runs in a thread
+    actual = await asyncio.get_running_loop().run_in_executor(None, _sha256_file, path)
+    return actual == expected.lower()
+
+
+async def _finalize(part_path, full_path, sha256):
+    """Verify a finished .part file against sha256 (if known) and move it into place."""
+    if sha256 and not await _sha256_matches(part_path, sha256):
+        os.remove(part_path)
+        raise ValueError("checksum mismatch, partial file removed")
+    os.replace(part_path, full_path)
+
+
+class _BatchedWriter:
+    """
+    Coalesces small writes to a StreamResponse.
+    
+    Data is buffered and sent once FLUSH_BYTES have piled up, or at the
+    latest FLUSH_INTERVAL seconds after the first buffered write. Safe to
+    share between concurrent download tasks.
+    """
+    
+    def __init__(self, response):
+        self._response = response
+        self._buffer = bytearray()
+        self._lock = asyncio.Lock()
+        self._loop = asyncio.get_running_loop()
+        self._timer = None
+    
+    async def write(self, data):
+        async with self._lock:
+            self._buffer += data
+            if len(self._buffer) >= FLUSH_BYTES:
+                await self._flush()
+            elif self._timer is None:
+                self._timer = self._loop.call_later(
+                    FLUSH_INTERVAL, lambda: asyncio.ensure_future(self.flush()))
+    
+    async def flush(self):
+        async with self._lock:
+            await self._flush()
+    
+    async def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if self._buffer:
+            # Hand the filled buffer over as-is and start a fresh one, rather
+            # than copying it out; the old one is never touched again
+            data, self._buffer = self._buffer, bytearray()
+            await self._response.write(data)
+
+
+class _Progress:
+    """
+    Byte counter for one download that reports at most every PROGRESS_INTERVAL.
+    """
+    
+    def __init__(self, name, total, write, downloaded=0):
+        self.name = name
+        self.total = total
+        self.downloaded = downloaded
+        self._write = write
+        self._loop = asyncio.get_running_loop()
+        self._last_report = float("-inf")
+    
+    async def advance(self, nbytes):
+        self.downloaded += nbytes
+        now = self._loop.time()
+        if now - self._last_report >= PROGRESS_INTERVAL:
+            self._last_report = now
+            await self._write(self._line())
+    
+    def _line(self):
+        downloaded = self.downloaded / MIB
+        if self.total:
+            return f"    {self.name}: {downloaded:.1f} / {self.total / MIB:.1f} MiB ({self.downloaded / self.total:.0%})\n".encode()
+        return f"    {self.name}: {downloaded:.1f} MiB\n".encode()
 
 
 async def download_handler(request):
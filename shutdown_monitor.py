@@ -1,26 +1,91 @@
 import os
+import sys
 import time
+import asyncio
+import functools
+import signal
 import threading
-import subprocess
+import aiohttp
 from aiohttp import web
 import json
 
 
+RUNPOD_GRAPHQL_URL = 'https://api.runpod.io/graphql'
+
+# podId is passed as a variable so it is never spliced into the query text
+POD_TERMINATE_MUTATION = '''
+mutation($podId: String!) {
+    podTerminate(input: {podId: $podId}) {
+        id
+    }
+}
+'''
+
+
 class ShutdownMonitor:
     def __init__(self):
         self.enabled = False
         self.last_activity = time.time()
         self.timeout = 600
-        self.monitor_thread = None
-        self.running = False
+        self.exit_grace_period = 30
         self.prompt_server = None
+        self._deadline_handle = None
+        
+        # The pod identity never changes, so the request is built once
+        runpod_pod_id = os.environ.get('RUNPOD_POD_ID')
+        runpod_api_key = os.environ.get('RUNPOD_API_KEY')
+        if runpod_pod_id and runpod_api_key:
+            self._runpod_payload = json.dumps({
+                'query': POD_TERMINATE_MUTATION,
+                'variables': {'podId': runpod_pod_id},
+            }).encode()
+            self._runpod_headers = {
+                'Content-Type': 'application/json',
+                'Authorization': f'Bearer {runpod_api_key}',
+            }
+        else:
+            self._runpod_payload = None
+            self._runpod_headers = None
         
     def set_prompt_server(self, server):
         self.prompt_server = server
+        self._hook_queue(getattr(server, 'prompt_queue', None))
+        self._hook_sigterm()
         
     def reset_timer(self):
         self.last_activity = time.time()
     
+    def _hook_queue(self, queue):
+        """Reset the idle timer whenever a prompt is queued or finishes."""
+        if queue is None or getattr(queue, '_pma_activity_hooked', False):
+            return
+        for name in ('put', 'task_done'):
+            method = getattr(queue, name, None)
+            if method is not None:
+                setattr(queue, name, self._with_activity(method))
+        queue._pma_activity_hooked = True
+    
+    def _hook_sigterm(self):
+        """Exit through SystemExit on SIGTERM, so cleanup and atexit hooks run."""
+        # Without a handler SIGTERM kills the process outright; leave any
+        # handler someone else installed alone
+        if signal.getsignal(signal.SIGTERM) is not signal.SIG_DFL:
+            return
+        try:
+            signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+        except ValueError:
+            # Handlers can only be installed from the main thread
+            print("[PMA Utils] Could not install SIGTERM handler; shutdown will not be graceful")
+    
+    def _with_activity(self, method):
+        @functools.wraps(method)
+        def wrapper(*args, **kwargs):
+            try:
+                return method(*args, **kwargs)
+            finally:
+                self.reset_timer()
+        return wrapper
+    
     def is_queue_active(self):
         if not self.prompt_server:
             return False
@@ -49,64 +114,65 @@ class ShutdownMonitor:
         return int(remaining)
     
     def toggle(self):
+        """Flip the auto-shutdown switch. Must be called on the event loop."""
         self.enabled = not self.enabled
         if self.enabled:
             self.reset_timer()
-            if not self.running:
-                self.start_monitoring()
+            self._schedule(self.timeout)
+        else:
+            self._cancel()
         return self.enabled
     
-    def start_monitoring(self):
-        if self.running:
-            return
-            
-        self.running = True
-        self.monitor_thread = threading.Thread(target=self._monitor_loop, daemon=True)
-        self.monitor_thread.start()
+    def _schedule(self, delay):
+        self._cancel()
+        self._deadline_handle = asyncio.get_running_loop().call_later(delay, self._on_deadline)
     
-    def _monitor_loop(self):
-        while self.running:
-            if self.enabled:
-                self.is_queue_active()
-                
-                time_remaining = self.get_time_remaining()
-                
-                if time_remaining <= 0:
-                    print("[PMA Utils] Queue empty for 10 minutes. Shutting down RunPod...")
-                    self._shutdown_runpod()
-                    break
-            
-            time.sleep(1)
+    def _cancel(self):
+        if self._deadline_handle is not None:
+            self._deadline_handle.cancel()
+            self._deadline_handle = None
     
-    def _shutdown_runpod(self):
-        runpod_pod_id = os.environ.get('RUNPOD_POD_ID')
-        runpod_api_key = os.environ.get('RUNPOD_API_KEY')
+    def _on_deadline(self):
+        # Nothing runs between deadlines; queue hooks and pings only move
+        # last_activity, so the timer is re-armed here for whatever time is
+        # left. The queue is inspected once, in case a single prompt has been
+        # running for the whole timeout.
+        self._deadline_handle = None
+        if not self.enabled:
+            return
         
-        if runpod_pod_id and runpod_api_key:
+        self.is_queue_active()
+        time_remaining = self.timeout - (time.time() - self.last_activity)
+        if time_remaining > 0:
+            self._schedule(time_remaining)
+            return
+        
+        print("[PMA Utils] Queue empty for 10 minutes. Shutting down RunPod...")
+        asyncio.ensure_future(self._shutdown_runpod())
+    
+    async def _shutdown_runpod(self):
+        if self._runpod_payload is not None:
             try:
-                query = f'''
-                mutation {{
-                    podTerminate(input: {{podId: "{runpod_pod_id}"}}) {{
-                        id
-                    }}
-                }}
-                '''
-                
-                subprocess.run([
-                    'curl', '-X', 'POST',
-                    '-H', 'Content-Type: application/json',
-                    '-H', f'Authorization: Bearer {runpod_api_key}',
-                    'https://api.runpod.io/graphql',
-                    '-d', json.dumps({'query': query})
-                ], check=True)
+                async with aiohttp.ClientSession() as session:
+                    async with session.post(
+                        RUNPOD_GRAPHQL_URL,
+                        data=self._runpod_payload,
+                        headers=self._runpod_headers,
+                    ) as resp:
+                        resp.raise_for_status()
                 
                 print("[PMA Utils] RunPod termination request sent successfully")
             except Exception as e:
                 print(f"[PMA Utils] Failed to terminate RunPod: {e}")
         else:
-            print("[PMA Utils] RunPod environment variables not found. Cannot shutdown.")
-            subprocess.run(['killall', '-9', 'python'])
-
+            print("[PMA Utils] RunPod environment variables not found. Stopping ComfyUI instead.")
+            # Stop only this process: SIGTERM unwinds it through SystemExit
+            # (see _hook_sigterm). The event loop stops with it, so the forced
+            # exit for a shutdown that hangs runs on a daemon timer thread.
+            timer = threading.Timer(self.exit_grace_period, os._exit, (1,))
+            timer.daemon = True
+            timer.start()
+            os.kill(os.getpid(), signal.SIGTERM)
 
 shutdown_monitor = ShutdownMonitor()
 
@@ -0,0 +1,47 @@
+"""
+Shared pytest fixtures for the Eye Stabilizer tests.
+"""
+
+import pytest
+import torch
+
+try:
+    import pytest_benchmark
+except ImportError:
+    pytest_benchmark = None
+
+# (batch, height, width) grid for the processing tests
+FRAME_SHAPES = [(1, 128, 128), (3, 256, 256), (8, 512, 512)]
+
+# One frame buffer per shape, allocated once and refilled per test.
+# Pinned (page-locked) memory needs CUDA; it lets the copy to the GPU run as DMA.
+_FRAME_BUFFERS = {}
+
+
+@pytest.fixture(params=FRAME_SHAPES, ids=lambda shape: "x".join(map(str, shape)))
+def frames(request):
+    """Random ComfyUI image batch [B, H, W, C] in [0, 1]."""
+    shape = (*request.param, 3)
+    buffer = _FRAME_BUFFERS.get(shape)
+    if buffer is None:
+        buffer = torch.empty(shape, pin_memory=torch.cuda.is_available())
+        _FRAME_BUFFERS[shape] = buffer
+    return buffer.uniform_(0, 1)
+
+
+@pytest.fixture(scope="session")
+def node():
+    """One EyeStabilizerNode shared by the whole run.
+    
+    stabilize_eyes resets the filters, blink detector and FaceMesh tracker
+    at the start of every call, so tests can reuse it without cleanup.
+    """
+    from eye_stabilizer_node import EyeStabilizerNode
+    return EyeStabilizerNode()
+
+
+if pytest_benchmark is None:
+    @pytest.fixture
+    def benchmark():
+        """Stand-in for pytest-benchmark's fixture when the plugin is missing."""
+        pytest.skip("pytest-benchmark not installed")
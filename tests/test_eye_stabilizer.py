@@ -0,0 +1,426 @@
+#!/usr/bin/env python3
+"""
+Test suite for Eye Stabilizer Node
+Verifies installation and basic functionality
+
+Set EYE_STAB_TEST_VERBOSE=1 (with pytest -s) for status output.
+
+Run from the repository root with pytest (parallel with pytest-xdist),
+or directly with python tests/test_eye_stabilizer.py:
+    pytest tests
+    pytest -n auto tests
+
+Benchmarks (pytest-benchmark; skipped when it is not installed):
+    pytest tests --benchmark-disable       # run once, no timing
+    pytest tests --benchmark-only --benchmark-compare-fail=median:10%
+"""
+
+import os
+import sys
+import time
+import statistics
+import pytest
+
+if __name__ == "__main__":
+    # Run as a script: hand over to pytest, which picks up tests/pytest.ini
+    # (and with it the import path for the nodes) before importing this file
+    sys.exit(pytest.main([__file__, *sys.argv[1:]]))
+
+import torch
+import numpy as np
+import cv2
+from PIL import Image
+
+from types import SimpleNamespace
+
+from eye_stabilizer_node import (
+    EyeStabilizerNode,
+    KalmanFilter1D,
+    VectorKalman1D,
+    KalmanFilterTorch,
+    BlinkDetector,
+    NODE_CLASS_MAPPINGS,
+    NODE_DISPLAY_NAME_MAPPINGS,
+    LEFT_EYE_IDX,
+    RIGHT_EYE_IDX,
+    LEFT_IRIS_IDX,
+    RIGHT_IRIS_IDX,
+    _ear,
+    njit,
+)
+from eye_stabilizer_v2_node import EyeStabilizerV2Node
+
+# Status output is off by default so the tests time the code, not the printing
+VERBOSE = os.environ.get("EYE_STAB_TEST_VERBOSE") == "1"
+
+# Node ids this module registers with ComfyUI
+EXPECTED_KEYS = frozenset({"PMAEyeStabilizer"})
+
+# Timed stabilize_eyes calls per processing test, after one warm-up call
+TIMED_RUNS = 10
+
+# Mock eye landmarks (6 points): p1 left corner, p2 top-left, p3 top-right,
+# p4 right corner, p5 bottom-right, p6 bottom-left
+_EYE_OPEN = np.array([[0, 0], [1, 1], [2, 1.2], [3, 0], [2, -1.2], [1, -1]], dtype=np.float32)
+_EYE_CLOSED = np.array([[0, 0], [1, 0.2], [2, 0.2], [3, 0], [2, -0.2], [1, -0.2]], dtype=np.float32)
+
+
+def _online_var(a):
+    """Population variance in a single pass (Welford)."""
+    n = 0
+    mean = 0.0
+    m2 = 0.0
+    for x in a.ravel():
+        n += 1
+        delta = x - mean
+        mean += delta / n
+        m2 += delta * (x - mean)
+    return m2 / n
+
+
+if njit is not None:
+    # Not cached on disk: the node kernels aren't either, and a cache keyed to
+    # this module's import name breaks when the tests run from another rootdir
+    _online_var = njit(_online_var)
+
+
+def _var_axis0(a):
+    """Per-channel variance of a (T, ...) sequence, from one pass over a and a**2."""
+    return (a * a).mean(axis=0) - a.mean(axis=0) ** 2
+
+
+@pytest.fixture(scope="module", autouse=True)
+def _warm_up_ear():
+    """Compile the EAR kernel once, before any test times it."""
+    BlinkDetector().calculate_ear(_EYE_OPEN)
+
+
+def test_imports():
+    """Test that all required imports work."""
+    if VERBOSE:
+        print(f"✓ PyTorch: {torch.__version__}\n"
+              f"✓ NumPy: {np.__version__}\n"
+              f"✓ OpenCV: {cv2.__version__}\n"
+              f"✓ PIL: {Image.__version__}")
+
+
+def test_mediapipe_import():
+    """MediaPipe is optional; without it the node runs in fallback mode."""
+    mediapipe = pytest.importorskip(
+        "mediapipe",
+        reason="MediaPipe not installed (node will work in fallback mode); "
+               "install with: pip install mediapipe==0.10.24"
+    )
+    if VERBOSE:
+        print(f"✓ MediaPipe: {mediapipe.__version__}")
+
+
+def test_node_loading():
+    """Test that the Eye Stabilizer node can be imported."""
+    assert NODE_CLASS_MAPPINGS["PMAEyeStabilizer"] is EyeStabilizerNode
+
+
+def test_node_initialization(node):
+    """Test that the node can be initialized."""
+    assert isinstance(node, EyeStabilizerNode)
+    if VERBOSE:
+        print(f"✓ Node initialized successfully\n"
+              f"  Type: {node.type}\n"
+              f"  MediaPipe available: {node.mediapipe_available}")
+
+
+def test_node_inputs(node):
+    """Test node input type definitions."""
+    input_types = node.INPUT_TYPES()
+    assert node.INPUT_TYPES() is input_types, "INPUT_TYPES is rebuilt on every call"
+    
+    required = input_types.get("required", {})
+    optional = input_types.get("optional", {})
+    
+    if VERBOSE:
+        print(f"✓ Required inputs ({len(required)}):")
+        for name in required.keys():
+            print(f"    - {name}")
+        
+        print(f"✓ Optional inputs ({len(optional)}):")
+        for name in optional.keys():
+            print(f"    - {name}")
+
+
+@pytest.mark.parametrize("dtype", [torch.float32, torch.bfloat16], ids=["fp32", "bf16"])
+def test_basic_processing(node, frames, dtype):
+    """Test basic frame processing."""
+    
+    # ComfyUI format: [B, H, W, C] in range [0, 1]. Half-precision batches
+    # are converted to uint8 in their own dtype, moving half the bytes.
+    batch_size = frames.shape[0]
+    test_frames = frames.to(dtype)
+    if torch.cuda.is_available():
+        # The whole batch goes to the GPU once; the node converts it there
+        test_frames = test_frames.to("cuda", non_blocking=True)
+    
+    kwargs = dict(
+        enable_temporal_smoothing=True,
+        enable_blink_detection=True,
+        enable_eye_enhancement=True,
+        smoothing_strength=0.7,
+        enhancement_strength=1.3,
+        blink_threshold=0.2,
+        eye_region_dilation=10
+    )
+    
+    # Process frames: one single-frame warm-up call takes the one-time costs
+    # (JIT, graph and thread-pool start-up), then the median of the timed runs
+    autocast = torch.autocast(test_frames.device.type, dtype=torch.bfloat16,
+                              enabled=dtype is not torch.float32)
+    timings = []
+    with torch.inference_mode(), autocast:
+        node.stabilize_eyes(images=test_frames[:1], **kwargs)
+        for _ in range(TIMED_RUNS):
+            start = time.perf_counter_ns()
+            stabilized, mask, debug = node.stabilize_eyes(images=test_frames, **kwargs)
+            if stabilized.is_cuda:
+                torch.cuda.synchronize()
+            timings.append(time.perf_counter_ns() - start)
+    median_ms = statistics.median(timings) / 1e6
+    
+    if VERBOSE:
+        print(f"  Created test batch: {test_frames.shape}\n"
+              f"  Stabilized output: {stabilized.shape}\n"
+              f"  Mask output: {mask.shape}\n"
+              f"  Debug output: {debug.shape}\n"
+              f"  Median over {TIMED_RUNS} runs: {median_ms:.1f} ms ({median_ms / batch_size:.2f} ms/frame)")
+    
+    # Verify output shapes
+    assert (stabilized.shape, mask.shape[0], debug.shape) == (test_frames.shape, batch_size, test_frames.shape), \
+        "Output shape mismatch"
+    # Outputs are always ComfyUI's float32 IMAGE, whatever the input precision
+    assert (stabilized.dtype, mask.dtype, debug.dtype) == (torch.float32,) * 3, "Output dtype mismatch"
+    assert not stabilized.requires_grad, "Output is tracked by autograd"
+    
+    # Random frames hold no face, so the output is the input up to 8-bit rounding
+    torch.testing.assert_close(stabilized.mean(), test_frames.float().mean().cpu(), rtol=1e-2, atol=1e-2)
+
+
+# Stub FaceMesh scene: square frames with both eyes on one row, drawn from the
+# mock outlines above scaled by _STUB_EYE_SCALE around their centers
+_STUB_SIZE = 128
+_STUB_EYE_CENTERS = ((40, 64), (88, 64))
+_STUB_EYE_SCALE = 8
+_STUB_DILATION = 10
+
+
+def _stub_face(eye):
+    """FaceMesh result holding one face whose eyes have the given 6-point outline."""
+    xy = np.full((478, 2), _STUB_SIZE / 2, dtype=np.float64)
+    for (eye_idx, iris_idx), center in zip(((LEFT_EYE_IDX, LEFT_IRIS_IDX),
+                                            (RIGHT_EYE_IDX, RIGHT_IRIS_IDX)), _STUB_EYE_CENTERS):
+        xy[eye_idx] = center + (eye - (1.5, 0)) * _STUB_EYE_SCALE
+        xy[iris_idx] = center + np.array([[0, 0], [3, 0], [0, 3], [-3, 0], [0, -3]])
+    # Pixel centers, so the nodes' truncation lands back on the same pixels
+    xy = (xy + 0.5) / _STUB_SIZE
+    landmarks = [SimpleNamespace(x=x, y=y) for x, y in xy.tolist()]
+    return SimpleNamespace(multi_face_landmarks=[SimpleNamespace(landmark=landmarks)])
+
+
+class _StubFaceMesh:
+    """Stands in for MediaPipe FaceMesh, replaying one canned result per frame."""
+    
+    def __init__(self, results):
+        self.results = list(results)
+        self.frames = 0
+    
+    def reset(self):
+        self.frames = 0
+    
+    def process(self, image):
+        assert image.shape == (_STUB_SIZE, _STUB_SIZE, 3), "Unexpected FaceMesh input"
+        result = self.results[self.frames]
+        self.frames += 1
+        return result
+
+
+# open, blink, dropout (no face found), open again
+_STUB_RESULTS = (
+    _stub_face(_EYE_OPEN),
+    _stub_face(_EYE_CLOSED),
+    SimpleNamespace(multi_face_landmarks=None),
+    _stub_face(_EYE_OPEN),
+)
+
+
+@pytest.mark.parametrize("node_cls, kwargs", [
+    (EyeStabilizerNode, dict(
+        enable_temporal_smoothing=False,
+        enable_blink_detection=True,
+        enable_eye_enhancement=True,
+        smoothing_strength=0.7,
+        enhancement_strength=1.5,
+        blink_threshold=0.2,
+    )),
+    (EyeStabilizerV2Node, dict(
+        ethnicity_preset="auto",
+        enable_temporal_smoothing=False,
+        enable_blink_detection=True,
+        enable_eye_enhancement=True,
+        blink_suppression_mode="off",
+        enhancement_override=1.5,
+    )),
+], ids=["v1", "v2"])
+def test_stub_face_mesh(node_cls, kwargs, monkeypatch):
+    """Masks and enhancement follow the tracked eyes, through a blink and a dropout."""
+    stub = _StubFaceMesh(_STUB_RESULTS)
+    node = node_cls()
+    # MediaPipe itself is never touched, so this also runs where it is missing
+    node.mediapipe_available = True
+    monkeypatch.setattr(node, "_get_face_mesh", lambda *args: stub)
+    
+    images = torch.rand((len(_STUB_RESULTS), _STUB_SIZE, _STUB_SIZE, 3),
+                        generator=torch.Generator().manual_seed(0))
+    stabilized, mask, debug = node.stabilize_eyes(
+        images=images, eye_region_dilation=_STUB_DILATION, **kwargs
+    )[:3]
+    assert stub.frames == len(_STUB_RESULTS), "FaceMesh did not see every frame"
+    
+    # Mask coverage: an open eye covers more than a closed one, no face covers nothing
+    covered = mask[..., 0] > 0
+    coverage = covered.float().mean(dim=(1, 2)).tolist()
+    assert coverage[0] == coverage[3], "Same landmarks gave different masks"
+    assert coverage[0] > coverage[1] > 0 == coverage[2], f"Unexpected mask coverage {coverage}"
+    
+    # ... and stays within the dilated eye boxes, over both eye centers
+    boxes = torch.zeros((_STUB_SIZE, _STUB_SIZE), dtype=torch.bool)
+    half_width = 1.5 * _STUB_EYE_SCALE + _STUB_DILATION
+    half_height = 1.2 * _STUB_EYE_SCALE + _STUB_DILATION
+    for x, y in _STUB_EYE_CENTERS:
+        boxes[int(y - half_height):int(y + half_height) + 1,
+              int(x - half_width):int(x + half_width) + 1] = True
+        assert covered[[0, 1, 3], y, x].all(), "Eye center is not masked"
+    assert not (covered & ~boxes).any(), "Mask reaches outside the eyes"
+    
+    # Enhancement: debug is the untouched frame (debug drawing is off), so
+    # the stabilized output may only differ from it inside the mask
+    torch.testing.assert_close(debug, images, rtol=0, atol=1 / 255)
+    enhanced = (stabilized != debug).any(dim=-1)
+    assert not (enhanced & ~covered).any(), "Pixels changed outside the eye mask"
+    assert enhanced[[0, 1, 3]].flatten(1).any(dim=1).all(), "Eyes were not enhanced"
+    assert not enhanced[2].any(), "Frame without a face was changed"
+
+
+def test_node_registration():
+    """Test that node is registered correctly."""
+    assert NODE_CLASS_MAPPINGS.keys() == EXPECTED_KEYS, "Unexpected node class mappings"
+    assert NODE_DISPLAY_NAME_MAPPINGS.keys() == EXPECTED_KEYS, "Display names don't match the node ids"
+
+
+def test_kalman_filter():
+    """Test Kalman filter component."""
+    kf = KalmanFilter1D()
+    
+    # Test with noisy data, filtered in a single batched call; the array is
+    # built once and reused by every check below
+    measurements = np.array([1.0, 1.2, 0.9, 1.1, 1.3, 0.8, 1.0], dtype=np.float64)
+    filtered = kf.update_batch(measurements)
+    
+    # Must match step-by-step updates
+    kf_step = KalmanFilter1D()
+    stepped = np.empty_like(measurements)
+    for i, m in enumerate(measurements):
+        stepped[i] = kf_step.update(m)
+    assert np.allclose(filtered, stepped), "Batched filter differs from update()"
+    assert np.isclose(_online_var(measurements), measurements.var()), "Welford variance is off"
+    
+    # Verify filtering is working (variance should be reduced)
+    input_var = _online_var(measurements)
+    output_var = _online_var(filtered)
+    
+    if VERBOSE:
+        print(f"  Input:    {measurements}\n"
+              f"  Filtered: {np.round(filtered, 2)}\n"
+              f"  Input variance:  {input_var:.4f}\n"
+              f"  Output variance: {output_var:.4f}\n"
+              f"  Reduction: {(1 - output_var/input_var)*100:.1f}%")
+    
+    assert output_var < input_var, "Filter not reducing variance"
+
+
+def test_kalman_filter_channels():
+    """Test Kalman filter over many independent channels at once."""
+    # 200 time steps of 64 noisy channels around different levels
+    rng = np.random.default_rng(0)
+    levels = rng.uniform(0.0, 1.0, size=64)
+    measurements = levels + rng.normal(0.0, 0.1, size=(200, 64))
+    
+    kf = KalmanFilter1D()
+    filtered = kf.update_batch(measurements)
+    
+    assert filtered.shape == measurements.shape, "Batched filter shape mismatch"
+    
+    # Skip the start-up transient, then every channel should be smoother
+    input_var = _var_axis0(measurements[50:])
+    output_var = _var_axis0(filtered[50:])
+    
+    if VERBOSE:
+        print(f"  Channels: {measurements.shape[1]}, steps: {measurements.shape[0]}\n"
+              f"  Mean variance reduction: {(1 - (output_var / input_var).mean())*100:.1f}%")
+    
+    assert np.all(output_var < input_var), "Filter not reducing variance on every channel"
+
+
+@pytest.mark.parametrize("device", [
+    "cpu",
+    pytest.param("cuda", marks=pytest.mark.skipif(not torch.cuda.is_available(), reason="CUDA not available")),
+])
+def test_kalman_filter_torch(device):
+    """Test the torch filter bank against the NumPy one."""
+    # 30 frames of noisy 468-point face landmarks
+    rng = np.random.default_rng(0)
+    measurements = rng.random((30, 468, 2), dtype=np.float32)
+    
+    kf_np = VectorKalman1D((468, 2))
+    kf_torch = KalmanFilterTorch((468, 2), device=device)
+    for meas in measurements:
+        expected = kf_np.update(meas)
+        filtered = kf_torch.update(torch.from_numpy(meas).to(device))
+    
+    assert filtered.device.type == device, "Filter state left its device"
+    torch.testing.assert_close(filtered.cpu(), torch.from_numpy(expected), rtol=1e-5, atol=1e-5)
+
+
+def test_blink_detector():
+    """Test blink detector component."""
+    
+    bd = BlinkDetector()
+    
+    # The module warm-up has already compiled the EAR kernel when Numba is installed
+    if njit is not None:
+        assert _ear.signatures, "EAR kernel was not JIT-compiled"
+    
+    ear_open, ear_closed = (bd.calculate_ear(eye) for eye in (_EYE_OPEN, _EYE_CLOSED))
+    
+    if VERBOSE:
+        print(f"  EAR (open):   {ear_open:.3f}\n"
+              f"  EAR (closed): {ear_closed:.3f}")
+    
+    assert ear_open > ear_closed, "Open eye should have higher EAR"
+    
+    # Batched, branchless variant agrees with the scalar EAR
+    batch = np.stack([_EYE_OPEN, _EYE_CLOSED, _EYE_CLOSED, _EYE_OPEN])
+    blinks = bd.is_blink_batch(batch, 0.2)
+    expected = np.array([bd.calculate_ear(eye) < 0.2 for eye in batch])
+    assert np.array_equal(blinks, expected), "Batched blink flags differ from calculate_ear"
+    assert np.array_equal(blinks, [False, True, True, False]), "Wrong blink flags"
+
+
+def test_ear_bench(benchmark):
+    """Throughput of the EAR kernel (pytest-benchmark)."""
+    pts = np.random.default_rng(0).random((6, 2)).astype(np.float32)
+    bd = BlinkDetector()
+    benchmark(bd.calculate_ear, pts)
+
+
+def test_kf_bench(benchmark):
+    """Throughput of the batched Kalman filter over 64 channels (pytest-benchmark)."""
+    measurements = np.random.default_rng(0).random((200, 64))
+    benchmark(lambda: KalmanFilter1D().update_batch(measurements))
+